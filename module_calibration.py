@@ -1,30 +1,255 @@
+import copy
+import hashlib
+import json
+import os
 import re
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import numpy as np
-from module_fds import loadFDS, saveFDS, InstrumentParameter
+from module_fds import loadFDS, saveFDS, readFDS, writeFDS, FdsFile, FdsHeader, FdsWriter, InstrumentParameter
+from module_fds import enable_parse_cache, get_parse_cache, file_digest, _expected_rows
+from module_eem_stack import EemStackWriter, is_eem_stack, remove_eem_stack
+from module_manifest import CalibrationManifest, MANIFEST_NAME
+
+_RE_NM = re.compile("(.*) nm")
+_RE_V = re.compile("(.*) V")
+
+# 短波長側・長波長側の装置関数の切り替え波長 [nm]（短波長側は WL_SPLICE 以下を使う）
+WL_SPLICE = 500
+# 装置関数キャッシュの形式（内容を変えた場合は上げる）
+INST_CACHE_VERSION = 1
+# Calibrator が保持する補正係数（入力の波長ごと）の数
+FACTOR_CACHE_SIZE = 32
+INST_CACHE_DIR_DEFAULT = Path(os.environ.get("LOCALAPPDATA", Path.home() / ".cache")) / "F7000_Spectral_Correction" / "inst_cache"
+
+
+def map_wl_to_index(vec_input: np.ndarray, vec_calib: np.ndarray):
+    """Map each input wavelength to the first exactly matching index of vec_calib
+
+    Returns
+    -------
+    index : np.ndarray
+        index into vec_calib (0 where no match)
+    found : np.ndarray
+        bool mask, True where vec_calib contains the input wavelength
+    """
+    vec_input = np.atleast_1d(vec_input)
+    vec_calib = np.asarray(vec_calib)
+    if vec_calib.size == 0:
+        return np.zeros(vec_input.shape, dtype=np.intp), np.zeros(vec_input.shape, dtype=bool)
+
+    # stable sort -> searchsorted(left) returns the first occurrence of duplicates
+    _order = np.argsort(vec_calib, kind="stable")
+    _sorted = vec_calib[_order]
+    _pos = np.minimum(np.searchsorted(_sorted, vec_input, side="left"), _sorted.size - 1)
+    found = _sorted[_pos] == vec_input
+    index = np.where(found, _order[_pos], 0)
+    return index, found
+
+
+def interp_wl_weights(vec_input: np.ndarray, vec_calib: np.ndarray, snap_tol: float = None):
+    """Linear interpolation of vec_calib at each input wavelength
+
+    value = data[index_lo] * (1 - weight) + data[index_hi] * weight
+    An input equal to a calib wavelength (or within snap_tol [nm] of one) uses that point only (weight 0)
+
+    Returns
+    -------
+    index_lo, index_hi : np.ndarray
+        index into vec_calib (0 where not found)
+    weight : np.ndarray
+    found : np.ndarray
+        bool mask, False outside the range of vec_calib (farther than snap_tol)
+    """
+    vec_input = np.atleast_1d(np.asarray(vec_input, dtype=float))
+    vec_calib = np.asarray(vec_calib, dtype=float)
+    _zeros = np.zeros(vec_input.shape, dtype=np.intp)
+    if vec_calib.size == 0:
+        return _zeros, _zeros.copy(), np.zeros(vec_input.shape), np.zeros(vec_input.shape, dtype=bool)
+
+    # stable sort -> exact matches use the first occurrence (same as map_wl_to_index)
+    _order = np.argsort(vec_calib, kind="stable")
+    _sorted = vec_calib[_order]
+    _last = _sorted.size - 1
+    _pos = np.searchsorted(_sorted, vec_input, side="left")
+    _hi = np.minimum(_pos, _last)
+    _lo = np.maximum(_pos - 1, 0)
+    _exact = _sorted[_hi] == vec_input
+    found = _exact | ((_pos > 0) & (_pos <= _last))
+
+    _span = _sorted[_hi] - _sorted[_lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.where(_span > 0, (vec_input - _sorted[_lo]) / _span, 0.0)
+    _lo = np.where(_exact, _hi, _lo)
+    weight[_exact | ~found] = 0.0
+
+    if snap_tol is not None:
+        _near = np.where(np.abs(_sorted[_lo] - vec_input) <= np.abs(_sorted[_hi] - vec_input), _lo, _hi)
+        _snap = np.abs(_sorted[_near] - vec_input) <= snap_tol
+        _lo = np.where(_snap, _near, _lo)
+        _hi = np.where(_snap, _near, _hi)
+        weight[_snap] = 0.0
+        found = found | _snap
+
+    index_lo = np.where(found, _order[_lo], 0)
+    index_hi = np.where(found, _order[_hi], 0)
+    return index_lo, index_hi, weight, found
+
+
+def _lerp(value_lo: np.ndarray, value_hi: np.ndarray, weight: np.ndarray):
+    """value_lo where weight is 0 (also when value_hi is inf, e.g. 1 / 0 of ON -> OFF)"""
+    with np.errstate(invalid="ignore", over="ignore"):
+        return np.where(weight == 0, value_lo, value_lo * (1 - weight) + value_hi * weight)
+
+
+def _calib_axis(vec_input, vec_calib, n: int, interpolate: bool = False, snap_tol: float = None):
+    """
+    index_lo, index_hi, weight, found of one axis, resized to n
+    (a single (fixed) wavelength applies to every row / column)
+    Without interpolate, only exact matches (or within snap_tol) are found
+    """
+    if interpolate or snap_tol is not None:
+        _lo, _hi, _weight, _found = interp_wl_weights(vec_input, vec_calib, snap_tol)
+        if not interpolate:
+            _found = _found & (_weight == 0)
+            _hi = _lo
+    else:
+        _lo, _found = map_wl_to_index(vec_input, vec_calib)
+        _hi, _weight = _lo, np.zeros(_lo.shape)
+    return np.resize(_lo, n), np.resize(_hi, n), np.resize(_weight, n), np.resize(_found, n)
 
 
 def calibrate_matrix(
     mat_input: np.ndarray, vec_ex_input: np.ndarray, vec_em_input: np.ndarray,
-    mat_calib: np.ndarray, vec_ex_calib: np.ndarray, vec_em_calib: np.ndarray
+    mat_calib, vec_ex_calib: np.ndarray, vec_em_calib: np.ndarray,
+    interpolate: bool = False, snap_tol: float = None
 ):
+    """
+    mat_calib
+        np.ndarray (em x ex): dense correction matrix.
+            Cells whose em or ex wavelength is not in the calib vectors are multiplied by 1
+        tuple (data_ex, data_em): rank-1 factors, applied as row/column scaling.
+        Either way, a cell whose em or ex wavelength is not found is left as input (multiplied by 1),
+        even if the other axis is found (same as the dense matrix before the rank-1 factors).
+        An axis without any instrument file (empty vec_*_calib) is a factor of 1 and counts as found
+        in the rank-1 path (an empty dense matrix is no correction)
+    interpolate
+        False: only exactly matching wavelengths are corrected
+        True: the instrument function is linearly interpolated onto the input wavelengths
+            (outside its range is multiplied by 1)
+    snap_tol
+        input wavelengths within snap_tol [nm] of a calib wavelength use that point
+    """
     # Emission matrix shape: (N, 1)
     # Excitation matrix shape: (1, N)
 
-    _mat_calib = np.ones(mat_input.shape)
-    for _iem in range(_mat_calib.shape[0]):
-        for _iex in range(_mat_calib.shape[1]):
-            _wl_em = vec_em_input if vec_em_input.size == 1 else vec_em_input[_iem]
-            _wl_ex = vec_ex_input if vec_ex_input.size == 1 else vec_ex_input[_iex]
-            if np.any(vec_em_calib == _wl_em) and np.any(vec_ex_calib == _wl_ex):
-                _mat_calib[_iem, _iex] = mat_calib[vec_em_calib == _wl_em, vec_ex_calib == _wl_ex]
-            else:
-                _mat_calib[_iem, _iex] = 1
+    _n_em, _n_ex = mat_input.shape
+    if isinstance(mat_calib, tuple):
+        return apply_calib_vectors(mat_input, *make_calib_vectors(
+            vec_ex_input, vec_em_input, _n_ex, _n_em, mat_calib, vec_ex_calib, vec_em_calib, interpolate, snap_tol))
 
+    if not interpolate and snap_tol is None:
+        _iem, _found_em = map_wl_to_index(vec_em_input, vec_em_calib)
+        _iex, _found_ex = map_wl_to_index(vec_ex_input, vec_ex_calib)
+        # a single (fixed) wavelength applies to every row / column
+        _iem, _found_em = np.resize(_iem, _n_em), np.resize(_found_em, _n_em)
+        _iex, _found_ex = np.resize(_iex, _n_ex), np.resize(_found_ex, _n_ex)
+
+        if mat_calib.size == 0:
+            _mat_calib = np.ones(mat_input.shape)
+        else:
+            _mat_calib = np.asarray(mat_calib, dtype=float)[np.ix_(_iem, _iex)]
+            _mat_calib[~(_found_em[:, None] & _found_ex[None, :])] = 1
+
+        return np.squeeze(mat_input * _mat_calib)
+
+    if mat_calib.size == 0:
+        return np.squeeze(mat_input * np.ones(mat_input.shape))
+    # bilinear interpolation
+    _lo_em, _hi_em, _w_em, _found_em = _calib_axis(vec_em_input, vec_em_calib, _n_em, interpolate, snap_tol)
+    _lo_ex, _hi_ex, _w_ex, _found_ex = _calib_axis(vec_ex_input, vec_ex_calib, _n_ex, interpolate, snap_tol)
+    _mat = np.asarray(mat_calib, dtype=float)
+    _w_em = _w_em[:, None]
+    _w_ex = _w_ex[None, :]
+    _mat_calib = _lerp(
+        _lerp(_mat[np.ix_(_lo_em, _lo_ex)], _mat[np.ix_(_lo_em, _hi_ex)], _w_ex),
+        _lerp(_mat[np.ix_(_hi_em, _lo_ex)], _mat[np.ix_(_hi_em, _hi_ex)], _w_ex), _w_em)
+    _mat_calib[~(_found_em[:, None] & _found_ex[None, :])] = 1
     return np.squeeze(mat_input * _mat_calib)
 
 
-def make_inst_func_matrix(filepath_exs: str = None, filepath_ems: str = None, filepath_exl: str = None, filepath_eml: str = None):
+def make_calib_vectors(
+    vec_ex_input: np.ndarray, vec_em_input: np.ndarray, n_ex: int, n_em: int,
+    calib_factors, vec_ex_calib: np.ndarray, vec_em_calib: np.ndarray,
+    interpolate: bool = False, snap_tol: float = None
+):
+    """
+    Column (ex) and row (em) correction factors for an input grid
+    calib_factors: (data_ex, data_em) on (vec_ex_calib, vec_em_calib)
+    Wavelengths not in the calib vectors get a factor of 1 (and are not found)
+    An axis without any instrument file (empty calib vector) is a factor of 1 on every wavelength,
+    and found, so the other axis is still applied
+    (interpolate, snap_tol: see calibrate_matrix)
+
+    Returns
+    -------
+    vec_ex (n_ex,), vec_em (n_em,),
+    found_ex (n_ex,), found_em (n_em,) : bool, None if all found (for apply_calib_vectors)
+    """
+    _data_ex, _data_em = calib_factors
+    if interpolate or snap_tol is not None:
+        vec_ex = np.ones(n_ex)
+        vec_em = np.ones(n_em)
+        _founds = []
+        for _vec, _data, _input, _calib in [(vec_ex, _data_ex, vec_ex_input, vec_ex_calib), (vec_em, _data_em, vec_em_input, vec_em_calib)]:
+            _lo, _hi, _weight, _found = _calib_axis(_input, _calib, _vec.size, interpolate, snap_tol)
+            _data = np.asarray(_data, dtype=float)
+            _vec[_found] = _lerp(_data[_lo[_found]], _data[_hi[_found]], _weight[_found])
+            _founds.append(_found)
+        return (vec_ex, vec_em) + _found_masks(*_founds, vec_ex_calib, vec_em_calib)
+
+    _iem, _found_em = map_wl_to_index(vec_em_input, vec_em_calib)
+    _iex, _found_ex = map_wl_to_index(vec_ex_input, vec_ex_calib)
+    # a single (fixed) wavelength applies to every row / column
+    _iem, _found_em = np.resize(_iem, n_em), np.resize(_found_em, n_em)
+    _iex, _found_ex = np.resize(_iex, n_ex), np.resize(_found_ex, n_ex)
+
+    vec_em = np.ones(n_em)
+    vec_ex = np.ones(n_ex)
+    vec_em[_found_em] = _data_em[_iem[_found_em]]
+    vec_ex[_found_ex] = _data_ex[_iex[_found_ex]]
+    return (vec_ex, vec_em) + _found_masks(_found_ex, _found_em, vec_ex_calib, vec_em_calib)
+
+
+def _found_masks(found_ex: np.ndarray, found_em: np.ndarray, vec_ex_calib, vec_em_calib):
+    """found_ex, found_em (an axis without calib is all found), None, None if all found"""
+    if np.size(vec_ex_calib) == 0:
+        found_ex = np.ones(found_ex.shape, dtype=bool)
+    if np.size(vec_em_calib) == 0:
+        found_em = np.ones(found_em.shape, dtype=bool)
+    if found_ex.all() and found_em.all():
+        return None, None
+    return found_ex, found_em
+
+
+def apply_calib_vectors(
+        mat_input: np.ndarray, vec_ex: np.ndarray, vec_em: np.ndarray,
+        found_ex: np.ndarray = None, found_em: np.ndarray = None):
+    """cells whose ex or em is not found (make_calib_vectors) are left as input"""
+    calibrated = mat_input * (vec_em[:, None] * vec_ex[None, :])
+    if found_ex is not None:
+        calibrated = np.where(found_em[:, None] & found_ex[None, :], calibrated, mat_input)
+    return np.squeeze(calibrated)
+
+
+def make_inst_func_vectors(filepath_exs: str = None, filepath_ems: str = None, filepath_exl: str = None, filepath_eml: str = None):
+    """
+    Rank-1 factors of the instrument function: EEM = data_em[:, None] * data_ex[None, :]
+    An axis without any file (unchecked in GUI) is returned as empty vectors (= implicit ones)
+    """
 
     _inst = InstrumentParameter()
 
@@ -35,63 +260,351 @@ def make_inst_func_matrix(filepath_exs: str = None, filepath_ems: str = None, fi
 
     if filepath_exs is not None:
         wl_exs, data_exs, header_exs = loadFDS(filepath_exs)
-        wl_threshold = np.inf if filepath_exl is None else 500
+        wl_threshold = np.inf if filepath_exl is None else WL_SPLICE
         list_wl_ex.append(wl_exs[wl_exs <= wl_threshold])
         list_data_ex.append(data_exs[wl_exs <= wl_threshold])
-        _inst.ex_s_slit_ex = float(re.findall("(.*) nm", header_exs.ExSlit)[0])
-        _inst.ex_s_slit_em = float(re.findall("(.*) nm", header_exs.EmSlit)[0])
-        _inst.ex_s_pmtvolt = float(re.findall("(.*) V", header_exs.PMTVolt)[0])
+        _inst.ex_s_slit_ex = float(_RE_NM.findall(header_exs.ExSlit)[0])
+        _inst.ex_s_slit_em = float(_RE_NM.findall(header_exs.EmSlit)[0])
+        _inst.ex_s_pmtvolt = float(_RE_V.findall(header_exs.PMTVolt)[0])
 
     if filepath_ems is not None:
         wl_ems, data_ems, header_ems = loadFDS(filepath_ems)
-        wl_threshold = np.inf if filepath_eml is None else 500
+        wl_threshold = np.inf if filepath_eml is None else WL_SPLICE
         list_wl_em.append(wl_ems[wl_ems <= wl_threshold])
         list_data_em.append(data_ems[wl_ems <= wl_threshold])
-        _inst.em_s_slit_ex = float(re.findall("(.*) nm", header_ems.ExSlit)[0])
-        _inst.em_s_slit_em = float(re.findall("(.*) nm", header_ems.EmSlit)[0])
-        _inst.em_s_pmtvolt = float(re.findall("(.*) V", header_ems.PMTVolt)[0])
+        _inst.em_s_slit_ex = float(_RE_NM.findall(header_ems.ExSlit)[0])
+        _inst.em_s_slit_em = float(_RE_NM.findall(header_ems.EmSlit)[0])
+        _inst.em_s_pmtvolt = float(_RE_V.findall(header_ems.PMTVolt)[0])
 
     if filepath_exl is not None:
         wl_exl, data_exl, header_exl = loadFDS(filepath_exl)
-        wl_threshold = -np.inf if filepath_exs is None else 500
+        wl_threshold = -np.inf if filepath_exs is None else WL_SPLICE
         list_wl_ex.append(wl_exl[wl_exl > wl_threshold])
         list_data_ex.append(data_exl[wl_exl > wl_threshold])
-        _inst.ex_l_slit_ex = float(re.findall("(.*) nm", header_exl.ExSlit)[0])
-        _inst.ex_l_slit_em = float(re.findall("(.*) nm", header_exl.EmSlit)[0])
-        _inst.ex_l_pmtvolt = float(re.findall("(.*) V", header_exl.PMTVolt)[0])
+        _inst.ex_l_slit_ex = float(_RE_NM.findall(header_exl.ExSlit)[0])
+        _inst.ex_l_slit_em = float(_RE_NM.findall(header_exl.EmSlit)[0])
+        _inst.ex_l_pmtvolt = float(_RE_V.findall(header_exl.PMTVolt)[0])
 
     if filepath_eml is not None:
         wl_eml, data_eml, header_eml = loadFDS(filepath_eml)
-        wl_threshold = -np.inf if filepath_ems is None else 500
+        wl_threshold = -np.inf if filepath_ems is None else WL_SPLICE
         list_wl_em.append(wl_eml[wl_eml > wl_threshold])
         list_data_em.append(data_eml[wl_eml > wl_threshold])
-        _inst.em_l_slit_ex = float(re.findall("(.*) nm", header_eml.ExSlit)[0])
-        _inst.em_l_slit_em = float(re.findall("(.*) nm", header_eml.EmSlit)[0])
-        _inst.em_l_pmtvolt = float(re.findall("(.*) V", header_eml.PMTVolt)[0])
+        _inst.em_l_slit_ex = float(_RE_NM.findall(header_eml.ExSlit)[0])
+        _inst.em_l_slit_em = float(_RE_NM.findall(header_eml.EmSlit)[0])
+        _inst.em_l_pmtvolt = float(_RE_V.findall(header_eml.PMTVolt)[0])
+
+    wl_ex: np.ndarray = np.concatenate(list_wl_ex) if list_wl_ex else np.zeros(0)
+    wl_em: np.ndarray = np.concatenate(list_wl_em) if list_wl_em else np.zeros(0)
+    data_ex = np.concatenate(list_data_ex) if list_data_ex else np.zeros(0)
+    data_em = np.concatenate(list_data_em) if list_data_em else np.zeros(0)
+
+    return wl_ex, wl_em, data_ex, data_em, _inst
+
 
-    wl_ex: np.ndarray = np.concatenate(list_wl_ex)
-    wl_em: np.ndarray = np.concatenate(list_wl_em)
-    data_ex = np.concatenate(list_data_ex)
-    data_em = np.concatenate(list_data_em)
+def inst_func_fingerprint(filepath_exs: str = None, filepath_ems: str = None, filepath_exl: str = None, filepath_eml: str = None) -> str:
+    """
+    Fingerprint of an instrument function: the four paths, their contents and the splice rule
+    """
+    _key = {"version": INST_CACHE_VERSION, "splice": WL_SPLICE}
+    for _name, _path in [("exs", filepath_exs), ("ems", filepath_ems), ("exl", filepath_exl), ("eml", filepath_eml)]:
+        _key[_name] = None if _path is None else [str(Path(_path).resolve()), file_digest(_path)]
+    return hashlib.blake2b(json.dumps(_key, sort_keys=True).encode("utf-8"), digest_size=20).hexdigest()
+
+
+def load_inst_func_cache(cache_dir, fingerprint: str):
+    """Returns wl_ex, wl_em, data_ex, data_em, inst (None if not cached)"""
+    _path = Path(cache_dir) / (fingerprint + ".npz")
+    try:
+        with np.load(_path, allow_pickle=False) as npz:
+            _inst = InstrumentParameter()
+            for _att, _val in json.loads(str(npz["inst"])).items():
+                setattr(_inst, _att, _val)
+            return npz["wl_ex"], npz["wl_em"], npz["data_ex"], npz["data_em"], _inst
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # 書きかけ・壊れたキャッシュは使わない（読み直して上書きする）
+        return None
+
+
+def save_inst_func_cache(cache_dir, fingerprint: str, wl_ex, wl_em, data_ex, data_em, inst: InstrumentParameter):
+    _path = Path(cache_dir) / (fingerprint + ".npz")
+    _tmp = _path.with_name(_path.name + ".{0}.tmp".format(os.getpid()))
+    try:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        with open(_tmp, "wb") as f:
+            np.savez(
+                f, wl_ex=wl_ex, wl_em=wl_em, data_ex=data_ex, data_em=data_em,
+                inst=np.array(json.dumps(vars(inst))))
+        os.replace(_tmp, _path)
+    except OSError:
+        # キャッシュに書けなくても装置関数の読み込み自体は成功させる
+        _tmp.unlink(missing_ok=True)
+
+
+def clear_inst_func_cache(cache_dir):
+    if not Path(cache_dir).is_dir():
+        return
+    for _path in Path(cache_dir).glob("*.npz"):
+        _path.unlink(missing_ok=True)
+
+
+def make_inst_func_matrix(filepath_exs: str = None, filepath_ems: str = None, filepath_exl: str = None, filepath_eml: str = None):
+    wl_ex, wl_em, data_ex, data_em, _inst = make_inst_func_vectors(filepath_exs, filepath_ems, filepath_exl, filepath_eml)
 
     data_eem: np.ndarray = np.dot(data_em[:, None], data_ex[None, :])
 
     return wl_ex, wl_em, data_eem, _inst
 
 
+def _arrange_em_ex(wl, data: np.ndarray, header: FdsHeader):
+    """
+    Returns wl_ex, wl_em, data (em x ex)
+    Wavelength scan: the fixed wavelength (FixWL) is used for the other axis
+    """
+    if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
+        fixwl = np.array(header.FixWL[:-3], dtype=float)
+
+        if "蛍光" in header.ScanMode or "Em" in header.ScanMode:
+            wl_ex = fixwl
+            wl_em = wl
+            data = data[:, None]
+        if "励起" in header.ScanMode or "Ex" in header.ScanMode:
+            wl_ex = wl
+            wl_em = fixwl
+            data = data[None, :]
+    elif header.MeasType == "3次元" or header.MeasType == "3-D scan":
+        wl_ex = wl[0]
+        wl_em = wl[1]
+    return wl_ex, wl_em, data
+
+
+class CalibrationCancelled(Exception):
+    """Raised by Calibrator.calibrate_stream when cancel_event is set (error of skipped files in calibrate_many)"""
+
+
+class CalibrationStats():
+    """
+    Stage timings of one file (Calibrator.set_stats)
+    stages : list of dict (stage, seconds, bytes, shape)
+        load     parse the input (bytes: input file size, shape: data)
+        factors  look up the instrument function for the input grid (shape: (em, ex))
+        correct  multiply (bytes: output array, shape: output array)
+        save     write the output (bytes: output file size)
+    """
+
+    def __init__(self, filepath_input) -> None:
+        self.filepath_input = str(filepath_input)
+        self.filepath_output = ""
+        self.stages = []
+        self._t = time.perf_counter()
+
+    def lap(self, stage: str, nbytes: int = None, shape=None) -> None:
+        """Record the time since the previous lap (or creation) as stage"""
+        _t = time.perf_counter()
+        self.add(stage, _t - self._t, nbytes, shape)
+        self._t = _t
+
+    def add(self, stage: str, seconds: float, nbytes: int = None, shape=None) -> None:
+        self.stages.append({
+            "stage": stage, "seconds": seconds,
+            "bytes": None if nbytes is None else int(nbytes),
+            "shape": None if shape is None else [int(_n) for _n in shape]})
+
+    @property
+    def total(self) -> float:
+        return sum(_stage["seconds"] for _stage in self.stages)
+
+    def to_dict(self) -> dict:
+        return {"input": self.filepath_input, "output": self.filepath_output, "total": self.total, "stages": self.stages}
+
+    def __repr__(self) -> str:
+        _stages = ", ".join("{0}={1:.4f}s".format(_stage["stage"], _stage["seconds"]) for _stage in self.stages)
+        return f"CalibrationStats({self.filepath_input!r}, {_stages})"
+
+
+class CalibrationResult():
+    """Result of one input file in Calibrator.calibrate_many"""
+
+    def __init__(
+            self, filepath_input, filepath_output: Path = None, error: Exception = None, stats: CalibrationStats = None,
+            skipped: bool = False) -> None:
+        self.filepath_input = filepath_input
+        self.filepath_output = filepath_output
+        self.error = error
+        # CalibrationStats (Calibrator.set_stats), None if disabled or failed
+        self.stats = stats
+        # True: not calibrated, filepath_output is up to date (Calibrator.set_manifest)
+        self.skipped = skipped
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self) -> str:
+        if self.skipped:
+            return f"CalibrationResult({self.filepath_input!r} -> {str(self.filepath_output)!r}, skipped)"
+        if self.ok:
+            return f"CalibrationResult({self.filepath_input!r} -> {str(self.filepath_output)!r})"
+        return f"CalibrationResult({self.filepath_input!r}, error={self.error!r})"
+
+
 class Calibrator():
     inst: InstrumentParameter
-    mat_inst_func: np.ndarray
+    vec_data_ex_inst: np.ndarray
+    vec_data_em_inst: np.ndarray
     vec_wl_ex_inst: np.ndarray
     vec_wl_em_inst: np.ndarray
     flag_inst_func: bool
     flag_output_dir: bool
     output_dir: str
+    inst_fingerprint: str
+    inst_cache_dir: Path
+    last_stats: CalibrationStats
 
     def __init__(self) -> None:
         self.flag_inst_func = False
         self.flag_output_dir = False
         self.output_dir = ""
+        self.inst_fingerprint = ""
+        self.inst_cache_dir = None
+        # (direction, wl_ex, wl_em) -> (vec_ex, vec_em)
+        self._factor_cache = OrderedDict()
+        # off-grid wavelengths (set_interpolation)
+        self.interpolate = False
+        self.snap_tol = None
+        # stage timings (set_stats)
+        self._stats_enabled = False
+        self.stats_callback = None
+        self.stats_log = None
+        self.last_stats = None
+        # skip up-to-date outputs (set_manifest)
+        self.manifest_enabled = False
+        self.manifest_path = None
+        # keep subfolders of the inputs under the output directory (set_input_root)
+        self.input_root = None
+
+    def set_interpolation(self, interpolate: bool = True, snap_tol: float = None):
+        """
+        interpolate : bool
+            True: interpolate the instrument function onto input wavelengths that are not in it
+            False: only exactly matching wavelengths are corrected (others are multiplied by 1)
+        snap_tol : float
+            input wavelengths within snap_tol [nm] of an instrument wavelength use that point (None: exact only)
+        """
+        self.interpolate = interpolate
+        self.snap_tol = snap_tol
+
+    def set_stats(self, enabled: bool = True, callback=None, path_log=None):
+        """
+        Record stage timings of each file as CalibrationStats (self.last_stats)
+
+        callback : callable
+            called with CalibrationStats after each file
+        path_log : str
+            append each CalibrationStats to this file as a JSON line
+        Worker processes of calibrate_many send their stats back, and callback / log run in this process.
+        """
+        self._stats_enabled = enabled
+        self.stats_callback = callback if enabled else None
+        self.stats_log = path_log if enabled else None
+        self.last_stats = None
+
+    def _emit_stats(self, stats: CalibrationStats):
+        self.last_stats = stats
+        if self.stats_callback is not None:
+            self.stats_callback(stats)
+        if self.stats_log is not None:
+            _record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            _record.update(stats.to_dict())
+            with open(self.stats_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(_record, ensure_ascii=False) + "\n")
+
+    def set_manifest(self, enabled: bool = True, path_db=None):
+        """
+        Record the provenance of each output (input hash, instrument function fingerprint, direction)
+        in a SQLite manifest (module_manifest), and skip inputs whose outputs are up to date
+        in calibrate_many and CalibrationPipeline.run (their results have skipped=True)
+
+        path_db : str
+            manifest file (None: MANIFEST_NAME in the output directory at each call)
+        """
+        self.manifest_enabled = enabled
+        self.manifest_path = path_db
+
+    def _manifest_settings(self) -> str:
+        """other settings that change the output"""
+        return json.dumps({"interpolate": self.interpolate, "snap_tol": self.snap_tol}, sort_keys=True)
+
+    def run_incremental(self, run, filepaths_input, bool_off_to_on=None, callback=None):
+        """
+        run(filepaths, callback) -> list of CalibrationResult, for the inputs that are not up to date
+        (callback is called in this thread, as calibrate_many / CalibrationPipeline.run do).
+        Without set_manifest, all inputs are passed to run.
+        Inputs whose output would overwrite that of an earlier input fail (ValueError) and are not passed to run.
+
+        Returns
+        -------
+        list of CalibrationResult (same order as filepaths_input)
+        """
+        filepaths_input = list(filepaths_input)
+        results = [None] * len(filepaths_input)
+
+        def _done(i, result):
+            results[i] = result
+            if callback is not None:
+                callback(result)
+
+        _todo = []
+        _clashes = self._find_output_clashes(filepaths_input)
+        for _i, _path in enumerate(filepaths_input):
+            if _i in _clashes:
+                _error = ValueError("the output of {0} has the same name as that of {1}".format(_path, _clashes[_i]))
+                _done(_i, CalibrationResult(_path, error=_error))
+            else:
+                _todo.append(_i)
+
+        if not self.manifest_enabled:
+            if _todo:
+                for _i, _result in zip(_todo, run([filepaths_input[_i] for _i in _todo], callback)):
+                    results[_i] = _result
+            return results
+
+        _path_db = Path(self.output_dir) / MANIFEST_NAME if self.manifest_path is None else self.manifest_path
+        _mode = {None: "auto", True: "on", False: "off"}[bool_off_to_on]
+        _settings = self._manifest_settings()
+
+        with CalibrationManifest(_path_db) as manifest:
+            _run = []
+            _signatures = {}
+            for _i in _todo:
+                _path = filepaths_input[_i]
+                _output, _signature = manifest.check(
+                    _path, _mode, self._output_dir_for(_path), self.inst_fingerprint, _settings)
+                if _output is None:
+                    _run.append(_i)
+                    _signatures[_path] = _signature
+                else:
+                    _done(_i, CalibrationResult(_path, _output, skipped=True))
+
+            def _record(result: CalibrationResult):
+                # 1ファイルごとに記録する（中断しても、終わったファイルは次回から飛ばす）
+                _signature = _signatures.get(result.filepath_input)
+                if result.ok and _signature is not None:
+                    _direction = "on" if Path(result.filepath_output).stem.endswith("_calib_on") else "off"
+                    manifest.record(
+                        result.filepath_input, _mode, self._output_dir_for(result.filepath_input), _signature,
+                        self.inst_fingerprint, _settings, _direction, result.filepath_output)
+                if callback is not None:
+                    callback(result)
+
+            if _run:
+                for _i, _result in zip(_run, run([filepaths_input[_i] for _i in _run], _record)):
+                    results[_i] = _result
+        return results
+
+    def set_inst_cache_dir(self, cache_dir):
+        """Cache the loaded instrument function in cache_dir (None: disabled)"""
+        self.inst_cache_dir = None if cache_dir is None else Path(cache_dir)
 
     def set_output_dir(self, dir_output):
         if dir_output is None:
@@ -101,12 +614,31 @@ class Calibrator():
         self.output_dir = dir_output
         self.flag_output_dir = True
 
+    def set_input_root(self, dir_root):
+        """
+        Inputs under dir_root are written to the same subfolder under the output directory
+        (dir_root/a/s.TXT -> output_dir/a/s_calib_on.TXT), others directly to the output directory
+        None: all outputs directly in the output directory
+        """
+        self.input_root = None if dir_root is None else Path(dir_root).resolve()
+
     def set_mat_inst_func(self, filepath_exs: str = None, filepath_ems: str = None, filepath_exl: str = None, filepath_eml: str = None):
-        self.vec_wl_ex_inst, self.vec_wl_em_inst, self.mat_inst_func, self.inst = make_inst_func_matrix(filepath_exs, filepath_ems, filepath_exl, filepath_eml)
+        _fingerprint = inst_func_fingerprint(filepath_exs, filepath_ems, filepath_exl, filepath_eml)
+        _inst_func = None
+        if self.inst_cache_dir is not None:
+            _inst_func = load_inst_func_cache(self.inst_cache_dir, _fingerprint)
+        if _inst_func is None:
+            _inst_func = make_inst_func_vectors(filepath_exs, filepath_ems, filepath_exl, filepath_eml)
+            if self.inst_cache_dir is not None:
+                save_inst_func_cache(self.inst_cache_dir, _fingerprint, *_inst_func)
+        self.vec_wl_ex_inst, self.vec_wl_em_inst, self.vec_data_ex_inst, self.vec_data_em_inst, self.inst = _inst_func
+        self.inst_fingerprint = _fingerprint
         self.flag_inst_func = True
+        self._factor_cache.clear()
 
     def clear_mat_inst_func(self):
         self.flag_inst_func = False
+        self._factor_cache.clear()
 
     def is_ready(self):
         return self.flag_inst_func and self.flag_output_dir
@@ -119,45 +651,470 @@ class Calibrator():
             raise ValueError("instrumental Function is not loaded")
         if not self.flag_output_dir:
             raise ValueError("output path is not selected")
+        self.last_stats = None
+        _stats = CalibrationStats(filepath_input) if self._stats_enabled else None
         wl, data, header = loadFDS(filepath_input)
+        if _stats is not None:
+            _stats.lap("load", os.path.getsize(filepath_input), None if data is None else data.shape)
+
+        calibrated = self._calibrate_data(wl, data, header, bool_off_to_on, _stats)
+        _path_output = self._output_path(filepath_input, header)
+        saveFDS(_path_output, wl, calibrated, header)
+        if _stats is not None:
+            _stats.lap("save", os.path.getsize(_path_output))
+            _stats.filepath_output = str(_path_output)
+            self._emit_stats(_stats)
+        return _path_output
+
+    def calibrate_arrays(self, wl, data: np.ndarray, header: FdsHeader, bool_off_to_on=None):
+        """
+        Calibrate in memory (no file I/O, output_dir is not needed)
+        wl, data, header : as returned by loadFDS / readFDS (not modified)
+
+        Returns
+        -------
+        wl, calibrated data, header for the output (CorrSpectra, Instrument updated)
+        """
+        if not self.flag_inst_func:
+            raise ValueError("instrumental Function is not loaded")
+        if header is None or data is None:
+            raise ValueError("input is not a FDS data")
+        header = copy.deepcopy(header)
+        return wl, self._calibrate_data(wl, data, header, bool_off_to_on), header
+
+    def calibrate_text(self, f_input, f_output=None, bool_off_to_on=None):
+        """
+        Calibrate FDS text from an open stream (open(path) or io.StringIO, binary such as io.BytesIO too)
+
+        f_output : text or binary stream
+            the calibrated FDS text is written here (e.g. io.StringIO, None: not written)
+
+        Returns
+        -------
+        wl, calibrated data, header for the output
+        """
+        if not self.flag_inst_func:
+            raise ValueError("instrumental Function is not loaded")
+        wl, data, header = readFDS(f_input)
+        if header is None or data is None:
+            raise ValueError("input is not a FDS text")
+        calibrated = self._calibrate_data(wl, data, header, bool_off_to_on)
+        if f_output is not None:
+            writeFDS(f_output, wl, calibrated, header)
+        return wl, calibrated, header
 
-        if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
-            fixwl = np.array(header.FixWL[:-3], dtype=float)
-
-            if "蛍光" in header.ScanMode or "Em" in header.ScanMode:
-                wl_ex = fixwl
-                wl_em = wl
-                data = data[:, None]
-            if "励起" in header.ScanMode or "Ex" in header.ScanMode:
-                wl_ex = wl
-                wl_em = fixwl
-                data = data[None, :]
-        elif header.MeasType == "3次元" or header.MeasType == "3-D scan":
-            wl_ex = wl[0]
-            wl_em = wl[1]
+    def _calibrate_data(self, wl, data: np.ndarray, header: FdsHeader, bool_off_to_on=None, stats: CalibrationStats = None):
+        """Correct data and update header for the output"""
+        wl_ex, wl_em, data = _arrange_em_ex(wl, data, header)
+        _off_to_on = self._select_direction(header, bool_off_to_on)
 
+        _vectors = self._get_calib_vectors(_off_to_on, wl_ex, wl_em, data.shape[1], data.shape[0])
+        if stats is not None:
+            stats.lap("factors", shape=(_vectors[1].size, _vectors[0].size))
+        calibrated = apply_calib_vectors(data, *_vectors)
+        if stats is not None:
+            stats.lap("correct", calibrated.nbytes, calibrated.shape)
+        return calibrated
+
+    def calibrate_stream(self, filepath_input, bool_off_to_on=None, block_rows: int = 256, progress=None, cancel_event=None):
+        """
+        Same as calibrate, but reads, corrects and writes block_rows rows at a time.
+        Peak memory does not depend on the EEM size, and writing starts before reading finishes.
+
+        progress : callable
+            called with (rows done, rows total or None) after each block
+        cancel_event : threading.Event
+            checked after each block; when set, CalibrationCancelled is raised (no output is written)
+        """
+        if not self.flag_inst_func:
+            raise ValueError("instrumental Function is not loaded")
+        if not self.flag_output_dir:
+            raise ValueError("output path is not selected")
+        self.last_stats = None
+        _stats = CalibrationStats(filepath_input) if self._stats_enabled else None
+        # accumulated over the blocks: load, correct, save [s]
+        _seconds = [0.0, 0.0, 0.0]
+        _t = time.perf_counter()
+        fds = FdsFile(filepath_input)
+        header = fds.header
+        is_3d = header.MeasType == "3次元" or header.MeasType == "3-D scan"
+        wl_ex_3d = fds.wl_ex
+
+        _off_to_on = self._select_direction(header, bool_off_to_on)
+        _path_output = self._output_path(filepath_input, header)
+        _n_total = _expected_rows(header) if is_3d else None
+        _n_done = 0
+        # write to a temporary file, so an existing output survives a failure or cancellation
+        _path_part = _path_output.with_name(_path_output.name + ".part")
+        try:
+            with FdsWriter(_path_part, header, wl_ex_3d) as writer:
+                for wl, data in fds.iter_blocks(block_rows):
+                    _t_read = time.perf_counter()
+                    wl_ex, wl_em, _data = _arrange_em_ex((wl_ex_3d, wl) if is_3d else wl, data, header)
+                    calibrated = apply_calib_vectors(_data, *self._make_calib_vectors(
+                        _off_to_on, wl_ex, wl_em, _data.shape[1], _data.shape[0]))
+                    _t_correct = time.perf_counter()
+                    writer.write_block(wl, calibrated.reshape(data.shape))
+                    _n_done += data.shape[0]
+                    _t_write = time.perf_counter()
+                    _seconds[0] += _t_read - _t
+                    _seconds[1] += _t_correct - _t_read
+                    _seconds[2] += _t_write - _t_correct
+                    _t = _t_write
+                    if progress is not None:
+                        progress(_n_done, _n_total)
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise CalibrationCancelled(filepath_input)
+            os.replace(_path_part, _path_output)
+        except BaseException:
+            # do not leave a truncated output
+            _path_part.unlink(missing_ok=True)
+            raise
+        if _stats is not None:
+            _shape = (_n_done, len(wl_ex_3d)) if is_3d else (_n_done,)
+            _stats.add("load", _seconds[0], os.path.getsize(filepath_input), _shape)
+            _stats.add("correct", _seconds[1], shape=_shape)
+            _stats.add("save", _seconds[2] + time.perf_counter() - _t, os.path.getsize(_path_output))
+            _stats.filepath_output = str(_path_output)
+            self._emit_stats(_stats)
+        return _path_output
+
+    def _select_direction(self, header: FdsHeader, bool_off_to_on=None) -> bool:
+        """
+        Select the direction for header (bool_off_to_on None: auto detect)
+        and update header (CorrSpectra, Instrument) for the output
+
+        Returns
+        -------
+        True: OFF -> ON (multiply by the instrument function), False: ON -> OFF
+        """
         if bool_off_to_on is None:
-            if header.CorrSpectra:
-                _calib = 1 / self.mat_inst_func
-            else:
-                _calib = self.mat_inst_func
-                header.Instrument = self.inst
-        elif bool_off_to_on:
-            _calib = self.mat_inst_func
-            header.Instrument = self.inst
-            header.CorrSpectra = False
-        else:
-            _calib = 1 / self.mat_inst_func
-            header.CorrSpectra = True
+            bool_off_to_on = not header.CorrSpectra
+        if bool_off_to_on:
+            # コピーを渡す（出力のヘッダーを変更しても self.inst は変わらない）
+            header.Instrument = copy.copy(self.inst)
+        header.CorrSpectra = bool_off_to_on
+        return bool_off_to_on
+
+    def _make_calib_vectors(self, bool_off_to_on: bool, wl_ex, wl_em, n_ex: int, n_em: int):
+        """
+        (vec_ex, vec_em, found_ex, found_em) for the direction (not cached)
+        ON -> OFF divides by the instrument function looked up (interpolated) on the input grid,
+        not by the reciprocals interpolated (they differ between the calib wavelengths)
+        """
+        vec_ex, vec_em, found_ex, found_em = make_calib_vectors(
+            wl_ex, wl_em, n_ex, n_em, (self.vec_data_ex_inst, self.vec_data_em_inst),
+            self.vec_wl_ex_inst, self.vec_wl_em_inst, self.interpolate, self.snap_tol)
+        if not bool_off_to_on:
+            # not found is 1 (1 / 1), 0 in the instrument function is inf as before
+            with np.errstate(divide="ignore"):
+                vec_ex, vec_em = 1 / vec_ex, 1 / vec_em
+        return vec_ex, vec_em, found_ex, found_em
+
+    def _get_calib_vectors(self, bool_off_to_on: bool, wl_ex, wl_em, n_ex: int, n_em: int):
+        """
+        Ready-to-apply factors (vec_ex, vec_em, found_ex, found_em) for an input grid
+        Kept in a LRU cache, so files on the same grid skip the lookup (and the interpolation)
+        Safe to call from several threads (module_pipeline): each OrderedDict operation is atomic,
+        and an entry evicted by another thread is simply made again
+        """
+        wl_ex = np.asarray(wl_ex, dtype=float)
+        wl_em = np.asarray(wl_em, dtype=float)
+        _key = (bool_off_to_on, self.interpolate, self.snap_tol, n_ex, n_em, wl_ex.tobytes(), wl_em.tobytes())
+        _vectors = self._factor_cache.get(_key)
+        if _vectors is not None:
+            try:
+                self._factor_cache.move_to_end(_key)
+            except KeyError:
+                pass
+            return _vectors
+
+        _vectors = self._make_calib_vectors(bool_off_to_on, wl_ex, wl_em, n_ex, n_em)
+        self._factor_cache[_key] = _vectors
+        while len(self._factor_cache) > FACTOR_CACHE_SIZE:
+            try:
+                self._factor_cache.popitem(last=False)
+            except KeyError:
+                break
+        return _vectors
 
-        calibrated = calibrate_matrix(data, wl_ex, wl_em, _calib, self.vec_wl_ex_inst, self.vec_wl_em_inst)
-        header.CorrSpectra = not header.CorrSpectra
+    def _output_dir_for(self, filepath_input) -> Path:
+        """output folder of filepath_input (set_input_root)"""
+        if self.input_root is None:
+            return Path(self.output_dir)
+        try:
+            return Path(self.output_dir) / Path(filepath_input).resolve().parent.relative_to(self.input_root)
+        except ValueError:
+            return Path(self.output_dir)
+
+    def _output_path(self, filepath_input, header: FdsHeader) -> Path:
+        """output file of filepath_input (the subfolder is made if needed)"""
         _corr = "_calib_on" if header.CorrSpectra else "_calib_off"
-        saveFDS(
-            Path(self.output_dir) / (Path(filepath_input).stem + _corr + Path(filepath_input).suffix),
-            wl, calibrated, header
-        )
-        return Path(self.output_dir) / (Path(filepath_input).stem + _corr + Path(filepath_input).suffix)
+        _dir_output = self._output_dir_for(filepath_input)
+        if self.input_root is not None:
+            _dir_output.mkdir(parents=True, exist_ok=True)
+        return _dir_output / (Path(filepath_input).stem + _corr + Path(filepath_input).suffix)
+
+    def _find_output_clashes(self, filepaths_input) -> dict:
+        """
+        Inputs that would be written to the same output as another input
+        (same output folder and file name, e.g. a/s.TXT and b/s.TXT without set_input_root, or the same input twice)
+
+        Returns
+        -------
+        dict: index of the later input -> the first input with the same output
+        """
+        _first = {}
+        clashes = {}
+        for _i, _path in enumerate(filepaths_input):
+            _key = os.path.normcase(str(self._output_dir_for(_path).resolve() / Path(_path).name))
+            if _key in _first:
+                clashes[_i] = _first[_key]
+            else:
+                _first[_key] = _path
+        return clashes
+
+    def calibrate_many(
+            self, filepaths_input, bool_off_to_on=None, jobs: int = None, callback=None,
+            executor: ProcessPoolExecutor = None, cancel_event=None):
+        """
+        Calibrate many files over a process pool
+
+        Parameters
+        ----------
+        filepaths_input : list of str
+        bool_off_to_on : bool or None
+            same as calibrate (None: auto detect for each file)
+        jobs : int
+            number of processes (None: os.cpu_count(), 1: run in this process)
+        callback : callable
+            called with each CalibrationResult as soon as it is finished
+        executor : ProcessPoolExecutor
+            pool made by make_executor, reused across calls (jobs is ignored)
+        cancel_event : threading.Event
+            when set, files not started yet are skipped (error is CalibrationCancelled)
+        With set_manifest, inputs whose outputs are up to date are not calibrated (skipped=True).
+
+        Returns
+        -------
+        list of CalibrationResult (same order as filepaths_input)
+        """
+        if not self.flag_inst_func:
+            raise ValueError("instrumental Function is not loaded")
+        if not self.flag_output_dir:
+            raise ValueError("output path is not selected")
+        return self.run_incremental(
+            lambda _paths, _callback: self._calibrate_many(_paths, bool_off_to_on, jobs, _callback, executor, cancel_event),
+            filepaths_input, bool_off_to_on, callback)
+
+    def _calibrate_many(self, filepaths_input, bool_off_to_on, jobs, callback, executor, cancel_event):
+        jobs = os.cpu_count() if jobs is None else jobs
+        jobs = max(1, min(jobs, len(filepaths_input)))
+
+        results = [None] * len(filepaths_input)
+        if executor is None and jobs == 1:
+            for _i, _path in enumerate(filepaths_input):
+                if cancel_event is not None and cancel_event.is_set():
+                    results[_i] = CalibrationResult(_path, error=CalibrationCancelled(_path))
+                else:
+                    results[_i] = _calibrate_one(self, _path, bool_off_to_on)
+                if callback is not None:
+                    callback(results[_i])
+            return results
+
+        if executor is None:
+            with self.make_executor(jobs) as executor:
+                return self._calibrate_many(filepaths_input, bool_off_to_on, None, callback, executor, cancel_event)
+
+        _futures = {
+            executor.submit(_calibrate_worker, _path, bool_off_to_on, (self.output_dir, self.input_root)): _i
+            for _i, _path in enumerate(filepaths_input)}
+        for _future in as_completed(_futures):
+            _i = _futures[_future]
+            if cancel_event is not None and cancel_event.is_set():
+                for _pending in _futures:
+                    _pending.cancel()
+            if _future.cancelled():
+                results[_i] = CalibrationResult(filepaths_input[_i], error=CalibrationCancelled(filepaths_input[_i]))
+                if callback is not None:
+                    callback(results[_i])
+                continue
+            try:
+                results[_i] = _future.result()
+            except Exception as e:  # noqa (e.g. broken pool, unpicklable error)
+                results[_i] = CalibrationResult(filepaths_input[_i], error=e)
+            if results[_i].stats is not None:
+                self._emit_stats(results[_i].stats)
+            if callback is not None:
+                callback(results[_i])
+        return results
+
+    def calibrate_to_stack(
+            self, filepaths_input, name: str = "eem_stack", bool_off_to_on=None, callback=None,
+            cancel_event=None, dtype=np.float64):
+        """
+        Calibrate 3-D scans and write them into EemStack containers (module_eem_stack) instead of FDS text files.
+        Files on the same grid (ScanEx/Em Start, End, Step in the header) and corrected in the same direction
+        (OFF -> ON or ON -> OFF, decided for each file when bool_off_to_on is None) go into one container
+        output_dir / name_ex<start>-<end>-<step>_em<start>-<end>-<step>_<on|off> (on/off: CorrSpectra after correction),
+        with index.csv (sample, sample_name, source, measure_date, corr_spectra).
+        Values are stored as calculated (not rounded, nor limited to 9999.9 as in the FDS text).
+        All inputs are calibrated (set_manifest is not used, a container is always written as a whole).
+        Containers of an earlier run with the same name (other grids or directions, or the older
+        name, name_1, ...) are removed when the run finishes without cancellation, so the output folder
+        holds only the stacks of this run.
+
+        Parameters
+        ----------
+        bool_off_to_on, callback, cancel_event : same as calibrate_many
+        dtype : dtype of the stacked data
+
+        Returns
+        -------
+        list of CalibrationResult (filepath_output is the container, same order as filepaths_input)
+        """
+        if not self.flag_inst_func:
+            raise ValueError("instrumental Function is not loaded")
+        if not self.flag_output_dir:
+            raise ValueError("output path is not selected")
+        filepaths_input = list(filepaths_input)
+        results = [None] * len(filepaths_input)
+
+        def _done(i, result):
+            results[i] = result
+            if result.stats is not None:
+                self._emit_stats(result.stats)
+            if callback is not None:
+                callback(result)
+
+        # ヘッダーだけ読んで、波長の範囲と補正の方向ごとに分ける（コンテナの大きさを先に決めるため、
+        # 自動の場合に補正後の CorrSpectra が違うデータを1つのコンテナに混ぜないため）
+        _groups = OrderedDict()
+        for _i, _path in enumerate(filepaths_input):
+            try:
+                header = FdsFile(_path).header
+                if header is None:
+                    raise ValueError("{0} is not a FDS file".format(_path))
+                if not (header.MeasType == "3次元" or header.MeasType == "3-D scan"):
+                    raise ValueError("{0} is not a 3-D scan".format(_path))
+            except Exception as e:  # noqa
+                _done(_i, CalibrationResult(_path, error=e))
+                continue
+            _off_to_on = not header.CorrSpectra if bool_off_to_on is None else bool(bool_off_to_on)
+            _groups.setdefault((_grid_key(header), _off_to_on), []).append(_i)
+
+        for _key, _indices in _groups.items():
+            _path_stack = Path(self.output_dir) / _stack_name(name, *_key)
+            writer = None
+            try:
+                for _i in _indices:
+                    _path = filepaths_input[_i]
+                    if cancel_event is not None and cancel_event.is_set():
+                        _done(_i, CalibrationResult(_path, error=CalibrationCancelled(_path)))
+                        continue
+                    try:
+                        _stats = CalibrationStats(_path) if self._stats_enabled else None
+                        wl, data, header = loadFDS(_path)
+                        if _stats is not None:
+                            _stats.lap("load", os.path.getsize(_path), data.shape)
+                        calibrated = self._calibrate_data(wl, data, header, bool_off_to_on, _stats)
+                        if writer is None:
+                            writer = EemStackWriter(_path_stack, wl[0], wl[1], len(_indices), dtype)
+                        elif not writer.is_same_grid(wl[0], wl[1]):
+                            raise ValueError("wavelengths of {0} differ from the stack {1}".format(_path, _path_stack))
+                        writer.write(calibrated, header, _path)
+                        if _stats is not None:
+                            _stats.lap("save", calibrated.nbytes)
+                            _stats.filepath_output = str(_path_stack)
+                    except Exception as e:  # noqa
+                        _done(_i, CalibrationResult(_path, error=e))
+                        continue
+                    _done(_i, CalibrationResult(_path, _path_stack, stats=_stats))
+            except BaseException:
+                if writer is not None:
+                    writer.abort()
+                raise
+            if writer is not None:
+                writer.close()
+
+        if cancel_event is None or not cancel_event.is_set():
+            _remove_stale_stacks(self.output_dir, name, [_stack_name(name, *_key) for _key in _groups])
+        return results
+
+    def make_executor(self, jobs: int = None) -> ProcessPoolExecutor:
+        """
+        Process pool for calibrate_many(executor=...)
+        Each worker keeps a copy of this calibrator (the instrument function is sent once per worker),
+        so make a new pool after changing the instrument function or other settings.
+        The output directory (and set_input_root) is sent with each file, so one pool can be used
+        by copies of this calibrator with other output directories.
+        """
+        # stats callback / log run in this process (calibrate_many)
+        _calibrator = copy.copy(self)
+        _calibrator.stats_callback = None
+        _calibrator.stats_log = None
+        return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(_calibrator, get_parse_cache()))
+
+
+def _grid_key(header: FdsHeader):
+    """3-D scan の波長の範囲（ヘッダーの値）"""
+    return (
+        header.ScanExStartWL, header.ScanExEndWL, header.ScanExStepWL,
+        header.ScanEmStartWL, header.ScanEmEndWL, header.ScanEmStepWL)
+
+
+def _stack_name(name: str, grid_key, off_to_on: bool) -> str:
+    """name_ex200-600-5_em250-800-2_on (calibrate_to_stack)"""
+    _values = []
+    for _text in grid_key:
+        _text = str(_text).strip()
+        if _text.endswith("nm"):
+            _text = _text[:-2].strip()
+        try:
+            _text = "{0:g}".format(float(_text))
+        except ValueError:
+            _text = re.sub(r"[^0-9A-Za-z.]+", "", _text)
+        _values.append(_text)
+    return "{0}_ex{1}-{2}-{3}_em{4}-{5}-{6}_{7}".format(name, *_values, "on" if off_to_on else "off")
+
+
+def _remove_stale_stacks(dir_output, name: str, names_keep) -> None:
+    """calibrate_to_stack の以前の実行で作ったコンテナ (name, name_1, ..., name_ex..._em..._on/off) を削除する"""
+    _pattern = re.compile(re.escape(name) + r"(_\d+|_ex.*_em.*_(on|off))?")
+    for _path in Path(dir_output).iterdir():
+        if _path.name in names_keep or not _pattern.fullmatch(_path.name):
+            continue
+        if _path.is_dir() and is_eem_stack(_path):
+            remove_eem_stack(_path)
+
+
+_worker_calibrator: Calibrator = None
+
+
+def _init_worker(calibrator: Calibrator, parse_cache=(None, None)):
+    global _worker_calibrator
+    _worker_calibrator = calibrator
+    # spawned workers do not inherit module state of module_fds
+    if parse_cache[0] is not None:
+        enable_parse_cache(*parse_cache)
+
+
+def _calibrate_worker(filepath_input, bool_off_to_on, output=None):
+    """output: (output_dir, input_root) of the calling calibrator"""
+    _calibrator = _worker_calibrator
+    if output is not None and output != (_calibrator.output_dir, _calibrator.input_root):
+        _calibrator = copy.copy(_calibrator)
+        _calibrator.set_output_dir(output[0])
+        _calibrator.input_root = output[1]
+    return _calibrate_one(_calibrator, filepath_input, bool_off_to_on)
+
+
+def _calibrate_one(calibrator: Calibrator, filepath_input, bool_off_to_on):
+    try:
+        _path_output = calibrator.calibrate(filepath_input, bool_off_to_on)
+        return CalibrationResult(filepath_input, _path_output, stats=calibrator.last_stats)
+    except Exception as e:  # noqa
+        return CalibrationResult(filepath_input, error=e)
 
 
 if __name__ == "__main__":
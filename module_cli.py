@@ -0,0 +1,180 @@
+"""
+コマンドラインからの一括補正（Qtを使わない）
+
+python module_cli.py --exs EX_short.TXT --ems EM_short.TXT --exl EX_long.TXT --eml EM_long.TXT \
+    -o output_dir data/*.TXT data_folder
+python module_cli.py ... --watch -o output_dir input_folder
+
+装置関数ファイルはGUIのチェックボックスと同様、いずれも省略可（1つ以上必要）
+入力はファイル、ワイルドカード、フォルダ（フォルダ内の *.txt, *.fd3、-r でサブフォルダも）
+
+2026 10 18 created
+"""
+
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+from module_calibration import Calibrator, INST_CACHE_DIR_DEFAULT
+from module_fds import enable_parse_cache
+from module_manifest import MANIFEST_NAME
+from module_pipeline import CalibrationPipeline
+from module_watch import FolderWatcher, WATCH_SUFFIXES, OUTPUT_STEM_SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+MODES = {"auto": None, "on": True, "off": False}
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Spectral correction of Hitachi F7000 FDS files (without GUI)")
+    parser.add_argument("inputs", nargs="+", help="input files, wildcards or folders")
+    parser.add_argument("-o", "--output", required=True, help="output folder")
+    parser.add_argument("--exs", help="instrument function: Ex short (200-600 nm)")
+    parser.add_argument("--ems", help="instrument function: Em short (200-600 nm)")
+    parser.add_argument("--exl", help="instrument function: Ex long (500-900 nm)")
+    parser.add_argument("--eml", help="instrument function: Em long (500-900 nm)")
+    parser.add_argument(
+        "--mode", choices=list(MODES), default="auto",
+        help="on: OFF -> ON, off: ON -> OFF, auto: from the CorrSpectra of each file (default)")
+    parser.add_argument(
+        "--interpolate", action="store_true",
+        help="interpolate the instrument function onto wavelengths that are not in it (default: exact match only)")
+    parser.add_argument(
+        "--snap-tol", type=float, default=None, metavar="NM",
+        help="wavelengths within NM of an instrument wavelength use that point")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of processes (default: number of CPUs)")
+    parser.add_argument(
+        "--pipeline", nargs=3, type=int, default=None, metavar=("READ", "CORRECT", "WRITE"),
+        help="overlap reading, correction and writing with threads (numbers of threads per stage), "
+             "instead of processes (-j); for files on network drives")
+    parser.add_argument(
+        "--stack", metavar="NAME",
+        help="write the corrected 3-D scans into one binary EEM stack per grid and direction "
+             "(OUTPUT/NAME_ex<start>-<end>-<step>_em<start>-<end>-<step>_<on|off>, module_eem_stack; "
+             "stacks of an earlier run with the same NAME are removed) "
+             "instead of text files")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="skip files whose outputs are up to date (same input, instrument function and mode), "
+             "recorded in OUTPUT/" + MANIFEST_NAME)
+    parser.add_argument("--manifest", metavar="FILE", help="--incremental with this manifest file")
+    parser.add_argument("-r", "--recursive", action="store_true", help="search input folders recursively")
+    parser.add_argument("--watch", action="store_true", help="keep watching the input folder (stop with Ctrl+C)")
+    parser.add_argument("--interval", type=float, default=5.0, help="--watch: polling interval [s]")
+    parser.add_argument("--no-inst-cache", action="store_true", help="do not cache the instrument function")
+    parser.add_argument("--parse-cache", metavar="DIR", help="cache parsed input files in DIR")
+    parser.add_argument("--stats-log", metavar="FILE", help="append stage timings of each file to FILE (JSON lines)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="print errors only")
+    return parser
+
+
+def expand_inputs(inputs, recursive: bool = False):
+    """
+    ファイル、ワイルドカード、フォルダを入力ファイルのリストにする（重複は除く、順序は保つ）
+    """
+    filepaths = []
+    for _input in inputs:
+        if os.path.isdir(_input):
+            _pattern = os.path.join(_input, "**", "*") if recursive else os.path.join(_input, "*")
+            _candidates = sorted(glob.glob(_pattern, recursive=recursive))
+            filepaths += [_path for _path in _candidates if _is_input_file(_path)]
+        elif glob.has_magic(_input):
+            filepaths += [_path for _path in sorted(glob.glob(_input, recursive=recursive)) if os.path.isfile(_path)]
+        else:
+            filepaths.append(_input)
+    return list(dict.fromkeys(filepaths))
+
+
+def input_root(filepaths):
+    """
+    入力ファイルに共通のフォルダ（出力フォルダに同じサブフォルダ構成で書き出す、Calibrator.set_input_root）
+    全て同じフォルダの場合はそのフォルダ（出力はサブフォルダを作らない）
+    共通のフォルダが無い場合（ドライブが違うなど）は None
+    """
+    try:
+        return os.path.commonpath([os.path.dirname(os.path.abspath(_path)) for _path in filepaths])
+    except ValueError:
+        return None
+
+
+def _is_input_file(path) -> bool:
+    _name, _ext = os.path.splitext(os.path.basename(path))
+    return os.path.isfile(path) and _ext.lower() in WATCH_SUFFIXES and not _name.endswith(OUTPUT_STEM_SUFFIXES)
+
+
+def main(argv=None) -> int:
+    args = make_parser().parse_args(argv)
+    logging.basicConfig(level=logging.ERROR if args.quiet else logging.INFO, format="%(message)s")
+
+    _inst_files = [args.exs, args.ems, args.exl, args.eml]
+    if all(_path is None for _path in _inst_files):
+        logger.error("no instrument function file (--exs, --ems, --exl, --eml)")
+        return 2
+    for _path in _inst_files:
+        if _path is not None and not os.path.isfile(_path):
+            logger.error("instrument function file not found: %s", _path)
+            return 2
+
+    Path(args.output).mkdir(parents=True, exist_ok=True)
+    if args.parse_cache is not None:
+        enable_parse_cache(args.parse_cache)
+
+    calibrator = Calibrator()
+    if not args.no_inst_cache:
+        calibrator.set_inst_cache_dir(INST_CACHE_DIR_DEFAULT)
+    calibrator.set_mat_inst_func(*_inst_files)
+    calibrator.set_output_dir(args.output)
+    calibrator.set_interpolation(args.interpolate, args.snap_tol)
+    if args.stats_log is not None:
+        calibrator.set_stats(path_log=args.stats_log)
+    if args.incremental or args.manifest is not None:
+        calibrator.set_manifest(path_db=args.manifest)
+
+    if args.watch:
+        if len(args.inputs) != 1 or not os.path.isdir(args.inputs[0]):
+            logger.error("--watch needs one input folder")
+            return 2
+        watcher = FolderWatcher(
+            calibrator, args.inputs[0], bool_off_to_on=MODES[args.mode], jobs=args.jobs, interval=args.interval)
+        watcher.run()
+        return 0
+
+    filepaths = expand_inputs(args.inputs, args.recursive)
+    if len(filepaths) == 0:
+        logger.error("no input files")
+        return 2
+    calibrator.set_input_root(input_root(filepaths))
+
+    def _report(result):
+        if result.skipped:
+            logger.info("%s: up to date (%s)", result.filepath_input, result.filepath_output)
+        elif result.ok:
+            logger.info("%s -> %s", result.filepath_input, result.filepath_output)
+        else:
+            logger.error("%s: %s", result.filepath_input, result.error)
+
+    if args.stack is not None:
+        results = calibrator.calibrate_to_stack(filepaths, args.stack, MODES[args.mode], callback=_report)
+    elif args.pipeline is not None:
+        if min(args.pipeline) < 1:
+            logger.error("--pipeline: numbers of threads must be 1 or more")
+            return 2
+        pipeline = CalibrationPipeline(calibrator, *args.pipeline)
+        results = pipeline.run(filepaths, MODES[args.mode], callback=_report)
+    else:
+        results = calibrator.calibrate_many(filepaths, MODES[args.mode], jobs=args.jobs, callback=_report)
+    n_failed = sum(not _result.ok for _result in results)
+    n_skipped = sum(_result.skipped for _result in results)
+    logger.info("%d files, %d up to date, %d failed", len(results), n_skipped, n_failed)
+    return 1 if n_failed else 0
+
+
+if __name__ == "__main__":
+    # 実行ファイル化した場合に、並列処理（-j）の子プロセスが main を実行しないように
+    multiprocessing.freeze_support()
+    sys.exit(main())
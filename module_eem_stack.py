@@ -0,0 +1,209 @@
+"""
+EemStack
+    多数の3-D scanを1つのメモリマップ配列 (sample x em x ex) にまとめたコンテナを読むクラス
+EemStackWriter
+    EemStack を1サンプルずつ書き出すクラス
+pack_eem_stack
+    FDSファイル (loadFDS) のリストから EemStack を作る関数
+is_eem_stack, remove_eem_stack
+    コンテナか判定する、削除する関数
+
+コンテナはフォルダで、以下のファイルからなる
+    data.npy    (sample x em x ex) の float 配列（np.load の mmap_mode で読む）
+    wl_ex.npy   励起波長（全サンプル共通）
+    wl_em.npy   蛍光波長（全サンプル共通）
+    index.json  サンプルごとの元ファイルのパス、ヘッダー
+    index.csv   サンプルの一覧表（番号、サンプル名、元ファイル、測定日時、CorrSpectra）
+
+2026 10 18 created
+"""
+
+import csv
+import json
+from pathlib import Path
+import numpy as np
+from numpy.lib.format import open_memmap
+from module_fds import loadFDS, FdsHeader, header_to_dict, header_from_dict
+
+STACK_DATA = "data.npy"
+STACK_WL_EX = "wl_ex.npy"
+STACK_WL_EM = "wl_em.npy"
+STACK_INDEX = "index.json"
+STACK_TABLE = "index.csv"
+# index.csv の列（index.json の各サンプルにも同じ項目を持つ）
+STACK_TABLE_COLUMNS = ["sample", "sample_name", "source", "measure_date", "corr_spectra"]
+
+
+class EemStackWriter():
+    """
+    with EemStackWriter(path_stack, wl_ex, wl_em, n_samples) as writer:
+        writer.write(data, header, source)
+    """
+
+    def __init__(self, path_stack, wl_ex: np.ndarray, wl_em: np.ndarray, n_samples: int, dtype=np.float64) -> None:
+        self.path = Path(path_stack)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.wl_ex = np.asarray(wl_ex, dtype=float)
+        self.wl_em = np.asarray(wl_em, dtype=float)
+        np.save(self.path / STACK_WL_EX, self.wl_ex)
+        np.save(self.path / STACK_WL_EM, self.wl_em)
+        self.data = open_memmap(
+            self.path / STACK_DATA, mode="w+", dtype=dtype,
+            shape=(n_samples, self.wl_em.size, self.wl_ex.size))
+        self.index = []
+
+    def is_same_grid(self, wl_ex: np.ndarray, wl_em: np.ndarray) -> bool:
+        return np.array_equal(self.wl_ex, wl_ex) and np.array_equal(self.wl_em, wl_em)
+
+    def write(self, data: np.ndarray, header: FdsHeader, source: str = "") -> int:
+        """Returns the sample index"""
+        _i = len(self.index)
+        if _i >= self.data.shape[0]:
+            raise IndexError("EemStackWriter: all {0} samples are already written".format(self.data.shape[0]))
+        if data.shape != self.data.shape[1:]:
+            raise ValueError("EemStackWriter: shape {0} does not match the stack {1}".format(data.shape, self.data.shape[1:]))
+        self.data[_i] = data
+        self.index.append({
+            "source": str(source), "sample_name": header.SampleName, "measure_date": header.MeasureDate,
+            "corr_spectra": header.CorrSpectra, "header": header_to_dict(header)})
+        return _i
+
+    def close(self) -> None:
+        if self.data is None:
+            return
+        self.data.flush()
+        self.data = None
+        # index.json は最後に書く（途中で失敗したコンテナは読み込めない）
+        # 確保した数より少ない場合、残りは EemStack で読まない
+        with open(self.path / STACK_TABLE, "w", encoding="utf-8-sig", newline="") as f:
+            _writer = csv.DictWriter(f, STACK_TABLE_COLUMNS, extrasaction="ignore")
+            _writer.writeheader()
+            for _i, _sample in enumerate(self.index):
+                _writer.writerow(dict(_sample, sample=_i))
+        with open(self.path / STACK_INDEX, "w", encoding="utf-8") as f:
+            json.dump({"n_samples": len(self.index), "samples": self.index}, f, ensure_ascii=False)
+
+    def abort(self) -> None:
+        """書きかけのコンテナを削除する"""
+        self.data = None
+        remove_eem_stack(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class EemStack():
+    """
+    stack = EemStack(path_stack)
+    stack.data           (sample x em x ex) の読み取り専用メモリマップ
+    stack.sample(i)      i番目のEEM (em x ex)、コピーしない
+    stack.window(...)    波長範囲で切り出し、コピーしない
+    stack.header(i)      i番目のFdsHeader
+    stack.table()        サンプルの一覧 (list of dict: sample, sample_name, source, measure_date, corr_spectra)
+    """
+
+    def __init__(self, path_stack) -> None:
+        self.path = Path(path_stack)
+        with open(self.path / STACK_INDEX, "r", encoding="utf-8") as f:
+            _index = json.load(f)
+        self.samples = _index["samples"]
+        self.wl_ex = np.load(self.path / STACK_WL_EX)
+        self.wl_em = np.load(self.path / STACK_WL_EM)
+        self.data = np.load(self.path / STACK_DATA, mmap_mode="r")[:_index["n_samples"]]
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def source(self, i: int) -> str:
+        return self.samples[i]["source"]
+
+    def header(self, i: int) -> FdsHeader:
+        return header_from_dict(self.samples[i]["header"])
+
+    def table(self):
+        """index.csv と同じ内容（古いコンテナはヘッダーから作る）"""
+        _table = []
+        for _i, _sample in enumerate(self.samples):
+            _header = _sample["header"]
+            _table.append({
+                "sample": _i, "sample_name": _sample.get("sample_name", _header.get("SampleName")),
+                "source": _sample["source"], "measure_date": _sample.get("measure_date", _header.get("MeasureDate")),
+                "corr_spectra": _sample.get("corr_spectra", _header.get("CorrSpectra"))})
+        return _table
+
+    def sample(self, i: int) -> np.ndarray:
+        return self.data[i]
+
+    def window(self, ex_range=None, em_range=None, samples=slice(None)):
+        """
+        ex_range, em_range: (min, max) [nm], 両端を含む (None: 全範囲)
+        波長は昇順であること
+
+        Returns
+        -------
+        wl_ex, wl_em, data (sample x em x ex)
+        """
+        _sl_ex = _wl_slice(self.wl_ex, ex_range)
+        _sl_em = _wl_slice(self.wl_em, em_range)
+        return self.wl_ex[_sl_ex], self.wl_em[_sl_em], self.data[samples, _sl_em, _sl_ex]
+
+
+def _wl_slice(wl: np.ndarray, wl_range) -> slice:
+    if wl_range is None:
+        return slice(None)
+    return slice(np.searchsorted(wl, wl_range[0], side="left"), np.searchsorted(wl, wl_range[1], side="right"))
+
+
+def is_eem_stack(path) -> bool:
+    """path がコンテナ（のフォルダ）か"""
+    _path = Path(path)
+    return (_path / STACK_DATA).is_file() or (_path / STACK_INDEX).is_file()
+
+
+def remove_eem_stack(path) -> None:
+    """コンテナのファイルを削除する（他のファイルがあればフォルダは残す）"""
+    _path = Path(path)
+    for _name in [STACK_DATA, STACK_WL_EX, STACK_WL_EM, STACK_TABLE, STACK_INDEX]:
+        (_path / _name).unlink(missing_ok=True)
+    try:
+        _path.rmdir()
+    except OSError:
+        pass
+
+
+def pack_eem_stack(filepaths, path_stack, dtype=np.float64) -> EemStack:
+    """
+    3-D scan のFDSファイルを1つの EemStack にまとめる
+    全ファイルの励起・蛍光波長が同じであること（違う場合は ValueError）
+    """
+    filepaths = list(filepaths)
+    if len(filepaths) == 0:
+        raise ValueError("pack_eem_stack: no input files")
+
+    writer = None
+    try:
+        for _path in filepaths:
+            wl, data, header = loadFDS(_path)
+            if header is None or not isinstance(wl, tuple):
+                raise ValueError("pack_eem_stack: {0} is not a 3-D scan".format(_path))
+            if writer is None:
+                writer = EemStackWriter(path_stack, wl[0], wl[1], len(filepaths), dtype)
+            elif not writer.is_same_grid(wl[0], wl[1]):
+                raise ValueError("pack_eem_stack: wavelengths of {0} differ from {1}".format(_path, filepaths[0]))
+            writer.write(data, header, _path)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    writer.close()
+    return EemStack(path_stack)
+
+
+if __name__ == "__main__":
+    pass
@@ -8,20 +8,52 @@ FdsHeader
     FDSファイルのヘッダー情報を保存するクラス
 FdsHeaderAlias
     各言語でのエイリアス名を保存するクラス（構造体として使用）
+FdsFile
+    FDSファイルのヘッダーを先に読み込み、データリストは必要になった時に読み込むクラス
 loadFDS
-    FDSファイルを読み込む関数
+    FDSファイルを読み込む関数（enable_parse_cache でキャッシュを有効にできる）
+iterFDS
+    FDSファイルのデータリストを数行ずつ読み込むジェネレータ
 saveFDS
     FDSファイルに書き出す関数
+FdsWriter
+    FDSファイルにヘッダー、データリストを順に（数行ずつ）書き出すクラス
 loadFDS_DataList
     FDSファイルのうち、データリスト部分のみを読み込む関数
+readFDS, writeFDS
+    開いたテキストストリーム（io.StringIO など）から読み込む・に書き出す関数
+set_io_hook
+    読み書き（loadFDS, loadFDS_DataList, FdsWriter, saveFDS）の時間、バイト数を受け取る関数を設定する
 
 FD3ファイルも読み込み・書き込み可能
 """
 
 from typing import Tuple
+from pathlib import Path
+import hashlib
+import io
+import json
+import os
 import re
+import time
+import zipfile
 import numpy as np
 
+# FDSファイルの拡張子（小文字で比べる、フォルダ内の入力ファイルの判定・ファイル選択のフィルター）
+FDS_SUFFIXES = (".txt", ".fd3")
+# 書き出し時のバッファサイズ、および一度に文字列にする行数
+WRITE_BUFFER_SIZE = 1 << 20
+WRITE_BLOCK_ROWS = 512
+
+# loadFDS のキャッシュ（enable_parse_cache で有効にする）
+PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_PARSE_CACHE_SUFFIX = ".fdscache.npz"
+_parse_cache_dir: Path = None
+_parse_cache_max_bytes = PARSE_CACHE_MAX_BYTES
+
+# 読み書きの計測（set_io_hook で設定、None: 計測しない）
+_io_hook = None
+
 
 class InstrumentParameter:
     """InstrumentParameter
@@ -67,6 +99,7 @@ class FdsHeader:
     FDSファイルのヘッダー情報を保存するためのクラス
 
     2022 12 21 MeasureDate, ShutterCtrl, Instrument added
+    2026 10 18 RawLines added
     """
 
     def __init__(self):
@@ -105,6 +138,11 @@ class FdsHeader:
 
         self.Instrument = InstrumentParameter()
 
+        # 読み込んだヘッダーの各行（データリストの行の手前まで、改行を含む）
+        # saveFDS はこれをそのまま書き出し、値の変わった行と装置関数のみ書き換える
+        # None: 全項目を FdsHeaderAlias から書き出す
+        self.RawLines = None
+
     def show(self):
         import pprint
         pprint.pprint(vars(self))
@@ -113,6 +151,7 @@ class FdsHeader:
         """
         2020 01 09 文字列でのみ保持
         2022 12 21 CorrSpectra, ShutterCtrl, parse_instrument_param
+        2026 10 18 precompiled pattern
 
         Parameters
         ----------
@@ -133,8 +172,7 @@ class FdsHeader:
         elif attribute == "ShutterCtrl":
             String = String == "On"
         else:
-            # String = re.search(r'(.*) *\n', String).group()
-            String = re.findall(r'(.*)\s*', String)[0]
+            String = _RE_FIELD.match(String).group(1)
             # if String[-1] == " ":
             #     String = String[:-1]
 
@@ -144,9 +182,9 @@ class FdsHeader:
         line = line.rstrip()
         if line == "":
             return False
-        _slit_ex = re.findall('ｽﾘｯﾄ：(.*?)/', line)[0]
-        _slit_em = re.findall('/(.*?)nm', line)[0]
-        _pmtvolt = re.findall('ﾎﾄﾏﾙ電圧：(.*?)V', line)[0]
+        _slit_ex = _RE_INST_SLIT_EX.search(line).group(1)
+        _slit_em = _RE_INST_SLIT_EM.search(line).group(1)
+        _pmtvolt = _RE_INST_PMTVOLT.search(line).group(1)
 
         _slit_ex = 0 if _slit_ex == "---" else float(_slit_ex)
         _slit_em = 0 if _slit_em == "---" else float(_slit_em)
@@ -241,164 +279,656 @@ class FdsHeaderAlias():
             self.ContourStep = "等高線間隔"
 
 
-def loadFDS(path: str) -> Tuple[np.ndarray, np.ndarray, FdsHeader]:
-    header = FdsHeader()
+_HEADER_ALIAS = {}
+_HEADER_GRAMMAR = {}
+
+_RE_FIELD = re.compile(r'(.*)\s*')
+_RE_INST_SLIT_EX = re.compile('ｽﾘｯﾄ：(.*?)/')
+_RE_INST_SLIT_EM = re.compile('/(.*?)nm')
+_RE_INST_PMTVOLT = re.compile('ﾎﾄﾏﾙ電圧：(.*?)V')
+
+
+def get_header_alias(lang="EN", bool_scan_mode_em=True) -> FdsHeaderAlias:
+    """FdsHeaderAlias を言語・スキャンモードごとに一度だけ作る（読み取り専用として使う）"""
+    key = (lang, bool_scan_mode_em)
+    if key not in _HEADER_ALIAS:
+        _HEADER_ALIAS[key] = FdsHeaderAlias(lang, bool_scan_mode_em)
+    return _HEADER_ALIAS[key]
+
+
+def get_header_grammar(lang="EN", bool_scan_mode_em=True) -> dict:
+    """
+    ヘッダーの項目名 -> FdsHeader の属性名 の辞書（FdsHeaderAlias の逆引き）
+    言語・スキャンモードごとに一度だけ作る
+    """
+    key = (lang, bool_scan_mode_em)
+    if key not in _HEADER_GRAMMAR:
+        grammar = {}
+        for _att, _label in vars(get_header_alias(lang, bool_scan_mode_em)).items():
+            # getKeyFromValue と同じく最初に見つかった属性を使う
+            grammar.setdefault(_label, _att)
+        _HEADER_GRAMMAR[key] = grammar
+    return _HEADER_GRAMMAR[key]
+
+
+class FdsFile:
+    """
+    FdsFile
+    FDSファイルのヘッダーのみを先に読み込むクラス
+    データリスト（wl, data）は初回アクセス時に読み込み、以降は保持する
+
+    2026 10 18 created
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.header: FdsHeader = None
+        self._offset_data = None
+        self._loaded = False
+        self._wl = None
+        self._data = None
+        self._read_header()
+
+    @property
+    def wl(self):
+        if not self._loaded:
+            self._read_data()
+        return self._wl
+
+    @property
+    def data(self):
+        if not self._loaded:
+            self._read_data()
+        return self._data
+
+    @property
+    def wl_ex(self):
+        """3-D scan: 励起波長（データリストの1行目）のみ読み込む"""
+        if self.header is None or not (self.header.MeasType == "3次元" or self.header.MeasType == "3-D scan"):
+            return None
+        if self._loaded:
+            return self._wl[0]
+        if self._offset_data is None:
+            return None
+        with open(self.path, "r") as f:
+            f.seek(self._offset_data)
+            for line in f:
+                if line.split():
+                    return np.array(line.split(), dtype=float)
+
+    def load(self):
+        return self.wl, self.data, self.header
+
+    def iter_blocks(self, block_rows: int = 256):
+        """
+        データリストを block_rows 行ずつ読み込むジェネレータ（ファイル全体をメモリに持たない）
 
-    flag_data = False
+        Yields
+        ------
+        Wavelength scan: wl (N,), data (N,)
+        3-D scan: wl_em (N,), data (N, N_ex)   (wl_ex は self.wl_ex)
+        """
+        is_3d = self.header.MeasType == "3次元" or self.header.MeasType == "3-D scan"
+        n_cols = self.wl_ex.size + 1 if is_3d else 2
+        with open(self.path, "r") as f:
+            f.seek(self._offset_data)
+            flag_first = True
+            lines = []
+            for line in f:
+                if flag_first and line.split():
+                    flag_first = False
+                    # 3-D scan: 励起波長の行、Wavelength scan: "nm\tData" の行
+                    if is_3d or line.split()[0] == "nm":
+                        continue
+                lines.append(line)
+                if len(lines) >= block_rows:
+                    yield _parse_block(lines, n_cols, is_3d)
+                    lines = []
+            if lines:
+                mat_data = _parse_block(lines, n_cols, is_3d)
+                if mat_data[0].size > 0:
+                    yield mat_data
+
+    def _read_header(self):
+        with open(self.path, "r") as f:
+            header, found_data = read_header(f)
+            if found_data:
+                self._offset_data = f.tell()
+        if header is None:
+            self._loaded = True
+        self.header = header
+
+    def _read_data(self):
+        self._loaded = True
+        if self.header is None:
+            return
+
+        text = ""
+        if self._offset_data is not None:
+            with open(self.path, "r") as f:
+                f.seek(self._offset_data)
+                text = f.read()
+        self._wl, self._data = parseFDS_DataList(text, self.header)
+
+
+def read_header(f):
+    """
+    テキストストリーム f からヘッダーを読み込む
+    f はデータリストの行（"Data points" / "ﾃﾞｰﾀﾘｽﾄ"）の次の行の位置まで進む
+
+    Returns
+    -------
+    header (FdsHeader, FDSファイルでない場合は None), データリストの行が見つかったか (bool)
+    """
+    header = FdsHeader()
     flag_inst = False
+    lines = []
 
-    with open(path, "r") as f:
-        lines = f.readlines()
+    line = f.readline()
 
     # 最初の一文字目で判断（手抜処理）
     # 対応言語が増えた場合に修正
     dict_lang = {'S': 'EN', 'ｻ': 'JP'}
-    if lines[0][0] in dict_lang:
-        alias = FdsHeaderAlias(dict_lang[lines[0][0]])
-        header.Language = dict_lang[lines[0][0]]
+    if line[:1] in dict_lang:
+        header.Language = dict_lang[line[0]]
     else:
+        return None, False
+    grammar = get_header_grammar(header.Language)
+
+    # データリストの手前まで読み込む（for文だとtellが使えないのでreadline）
+    while line:
+        if flag_inst:
+            flag_inst = header.parse_instrument_param(line)
+        elif line.rstrip() == "ﾃﾞｰﾀﾘｽﾄ" or line.rstrip() == "Data points":
+            header.RawLines = lines
+            return header, True
+        elif line.rstrip() == "装置関数":
+            flag_inst = True
+        else:
+            # ヘッダー読込
+            _buf = line.split(':\t')
+            _att = grammar.get(_buf[0])
+            if _att == "ScanMode":
+                # 固定波長 (FixWL) の項目名はスキャンモードで変わる
+                if "励起" in _buf[1] or "Excitation" in _buf[1]:
+                    grammar = get_header_grammar(header.Language, False)
+                elif "蛍光" in _buf[1] or "Emission" in _buf[1]:
+                    grammar = get_header_grammar(header.Language, True)
+            if len(_buf) >= 2 and _att is not None and _buf[1] != '\n':
+                # print(_att, _buf[1])
+                # Avoid \n
+                header.parseString(_att, _buf[1])
+        lines.append(line)
+        line = f.readline()
+    return header, False
+
+
+def readFDS(f) -> Tuple[np.ndarray, np.ndarray, FdsHeader]:
+    """
+    開いたテキストストリーム（open(path) や io.StringIO）から読み込む（loadFDS と同じ戻り値）
+    バイナリストリーム（open(path, "rb") や io.BytesIO）は loadFDS と同じエンコーディングで読む
+    """
+    with _TextStream(f) as _f:
+        header, found_data = read_header(_f)
+        if header is None:
+            return None, None, None
+        wl, data = parseFDS_DataList(_f.read() if found_data else "", header)
+    return wl, data, header
+
+
+def writeFDS(f, wl: np.ndarray, data: np.ndarray, header: FdsHeader) -> None:
+    """
+    テキストストリーム f（io.StringIO など）に書き出す（saveFDS と同じ内容、f は閉じない）
+    バイナリストリーム（io.BytesIO など）は saveFDS と同じエンコーディングで書く
+    """
+    with _TextStream(f) as _f:
+        saveFDS(_f, wl, data, header)
+
+
+class _TextStream():
+    """
+    バイナリストリームを TextIOWrapper で包む（テキストストリームはそのまま）
+    エンコーディングは open(path) と同じ既定（日本語の Windows では cp932）
+    終わったら包みを外す（f は閉じない）
+    """
+
+    def __init__(self, f) -> None:
+        self.f = f
+        self._wrapper = None
+        if isinstance(f, (io.RawIOBase, io.BufferedIOBase)):
+            self._wrapper = io.TextIOWrapper(f, encoding=None, newline=None)
+
+    def __enter__(self):
+        return self.f if self._wrapper is None else self._wrapper
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._wrapper is not None:
+            self._wrapper.flush()
+            self._wrapper.detach()
+
+
+def _parse_block(lines, n_cols: int, is_3d: bool):
+    mat_data = _parse_values("".join(lines).strip(), n_cols)
+    if mat_data is None:
+        list_data = _parse_data_lines(lines)
+        mat_data = np.stack(list_data) if list_data else np.zeros((0, n_cols))
+    if is_3d:
+        return mat_data[:, 0], mat_data[:, 1:]
+    return mat_data[:, 0], mat_data[:, 1]
+
+
+def iterFDS(path: str, block_rows: int = 256):
+    """
+    FdsFile(path).iter_blocks(block_rows) と同じ
+    3-D scan の励起波長、ヘッダーが必要な場合は FdsFile を使う
+    """
+    yield from FdsFile(path).iter_blocks(block_rows)
+
+
+def set_io_hook(hook=None) -> None:
+    """
+    hook(op, func, path, nbytes, seconds) を loadFDS, loadFDS_DataList, FdsWriter（saveFDS）の後に呼ぶ
+    op: "read" or "write"、nbytes: ファイルサイズ
+    hook=None で解除（解除中は計測しない）
+    設定はこのプロセスのみ（calibrate_many の子プロセスには引き継がれない）
+    """
+    global _io_hook
+    _io_hook = hook
+
+
+def loadFDS(path: str) -> Tuple[np.ndarray, np.ndarray, FdsHeader]:
+    if _io_hook is None:
+        return _load_fds(path)
+    _t = time.perf_counter()
+    _result = _load_fds(path)
+    _io_hook("read", "loadFDS", str(path), os.path.getsize(path), time.perf_counter() - _t)
+    return _result
+
+
+def _load_fds(path: str):
+    if _parse_cache_dir is not None:
+        _cached = _load_parse_cache(path)
+        if _cached is not None:
+            return _cached
+    fds = FdsFile(path)
+    if fds.header is None:
         return None, None, None
-    dict_alias = vars(alias)
+    wl, data, header = fds.load()
+    if _parse_cache_dir is not None and data is not None:
+        _save_parse_cache(path, wl, data, header)
+    return wl, data, header
 
-    list_data = []
 
-    for line in lines:
-        # linesを一行ずつlineに格納して以下を実行
-        if flag_data:  # もしデータリストだったら
-            buff = line.split()  # 読み込んだ行を\t (タブスペースのこと)や\n（改行のこと）で分割
-            if len(buff) == 0:
-                continue
-            if buff[0] == "nm":
-                continue
-            list_data.append(np.array(buff, dtype=float))
-        elif flag_inst:
-            flag_inst = header.parse_instrument_param(line)
-        else:  # まだデータリストでなかったら
-            if line.rstrip() == "ﾃﾞｰﾀﾘｽﾄ" or line.rstrip() == "Data points":
-                flag_data = True
-            elif line.rstrip() == "装置関数":
-                flag_inst = True
+def enable_parse_cache(cache_dir: str, max_bytes: int = PARSE_CACHE_MAX_BYTES) -> None:
+    """
+    loadFDS の結果（ヘッダー、波長、データ）を cache_dir にバイナリ (.npz) で保存し、
+    ファイルが変わっていなければ次回からそれを返す
+    キャッシュの合計が max_bytes を超えたら古いもの（最後に使われた時刻順）から削除する
+    """
+    global _parse_cache_dir, _parse_cache_max_bytes
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    _parse_cache_dir = Path(cache_dir)
+    _parse_cache_max_bytes = max_bytes
+
+
+def disable_parse_cache() -> None:
+    global _parse_cache_dir
+    _parse_cache_dir = None
+
+
+def get_parse_cache():
+    """Returns (cache_dir, max_bytes), cache_dir is None when disabled"""
+    return _parse_cache_dir, _parse_cache_max_bytes
+
+
+def clear_parse_cache(cache_dir: str = None) -> None:
+    """cache_dir (None: 有効になっているキャッシュ) のキャッシュを全て削除する"""
+    cache_dir = _parse_cache_dir if cache_dir is None else Path(cache_dir)
+    if cache_dir is None or not cache_dir.is_dir():
+        return
+    for _path in cache_dir.glob("*" + _PARSE_CACHE_SUFFIX):
+        _path.unlink(missing_ok=True)
+
+
+def file_digest(path: str) -> str:
+    """ファイル内容のハッシュ値 (blake2b)"""
+    _hash = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for _chunk in iter(lambda: f.read(1 << 20), b""):
+            _hash.update(_chunk)
+    return _hash.hexdigest()
+
+
+def header_to_dict(header: FdsHeader) -> dict:
+    _dict = dict(vars(header))
+    _dict["Instrument"] = dict(vars(header.Instrument))
+    return _dict
+
+
+def header_from_dict(dict_header: dict) -> FdsHeader:
+    header = FdsHeader()
+    for _att, _val in dict_header.items():
+        if _att == "Instrument":
+            for _att_inst, _val_inst in _val.items():
+                setattr(header.Instrument, _att_inst, _val_inst)
+        else:
+            setattr(header, _att, _val)
+    return header
+
+
+def _parse_cache_entry(path: str) -> Path:
+    _key = hashlib.blake2b(str(Path(path).resolve()).encode("utf-8"), digest_size=20).hexdigest()
+    return _parse_cache_dir / (_key + _PARSE_CACHE_SUFFIX)
+
+
+def _load_parse_cache(path: str):
+    _entry = _parse_cache_entry(path)
+    try:
+        with np.load(_entry, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["meta"]))
+            _stat = os.stat(path)
+            # サイズ・更新日時が同じで、内容も同じ場合のみ使う
+            if meta["path"] != str(Path(path).resolve()) or meta["size"] != _stat.st_size or meta["mtime_ns"] != _stat.st_mtime_ns:
+                return None
+            if meta["digest"] != file_digest(path):
+                return None
+            if meta["is_3d"]:
+                wl = (npz["wl_ex"], npz["wl_em"])
             else:
-                # ヘッダー読込
-                _buf = line.split(':\t')
-                _att = getKeyFromValue(dict_alias, _buf[0])
-                if _att is not None and "ScanMode" in _att:
-                    # TODO: これは突貫対応
-                    # TODO: 英語版対応
-                    if "蛍光" in _buf[1]:
-                        dict_alias["FixWL"] = "励起波長"
-                    if "励起" in _buf[1]:
-                        dict_alias["FixWL"] = "蛍光波長"
-                    if "Emission" in _buf[1]:
-                        dict_alias["FixWL"] = "EX WL"
-                    if "Excitation" in _buf[1]:
-                        dict_alias["FixWL"] = "EM WL"
-                if len(_buf) >= 2 and _att is not None and _buf[1] != '\n':
-                    # print(_att, _buf[1])
-                    # Avoid \n
-                    header.parseString(_att, _buf[1])
-    if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
-        mat_data = np.stack(list_data)
-        return mat_data[:, 0], mat_data[:, 1], header
-    elif header.MeasType == "3次元" or header.MeasType == "3-D scan":
-        wl_ex = list_data.pop(0)
-        mat_data = np.stack(list_data)
-        wl_em = mat_data[:, 0]
-        data = mat_data[:, 1:]
-        return (wl_ex, wl_em), data, header
+                wl = npz["wl"]
+            data = npz["data"]
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # 書きかけ・壊れたキャッシュは使わない（読み直して上書きする）
+        return None
+    # 最後に使われた時刻（削除の順番に使う）
+    try:
+        os.utime(_entry)
+    except OSError:
+        pass
+    return wl, data, header_from_dict(meta["header"])
+
+
+def _save_parse_cache(path: str, wl, data: np.ndarray, header: FdsHeader) -> None:
+    _entry = _parse_cache_entry(path)
+    _stat = os.stat(path)
+    is_3d = isinstance(wl, tuple)
+    meta = {
+        "path": str(Path(path).resolve()), "size": _stat.st_size, "mtime_ns": _stat.st_mtime_ns,
+        "digest": file_digest(path), "is_3d": is_3d, "header": header_to_dict(header)}
+    arrays = {"wl_ex": wl[0], "wl_em": wl[1]} if is_3d else {"wl": wl}
+    _tmp = _entry.with_name(_entry.name + ".{0}.tmp".format(os.getpid()))
+    try:
+        with open(_tmp, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta, ensure_ascii=False)), data=data, **arrays)
+        os.replace(_tmp, _entry)
+    except OSError:
+        # キャッシュに書けなくても読み込み自体は成功させる
+        _tmp.unlink(missing_ok=True)
+        return
+    _evict_parse_cache()
+
+
+def _evict_parse_cache() -> None:
+    list_entry = []
+    for _path in _parse_cache_dir.glob("*" + _PARSE_CACHE_SUFFIX):
+        try:
+            _stat = _path.stat()
+        except OSError:
+            continue
+        list_entry.append((_stat.st_mtime, _stat.st_size, _path))
+    _total = sum(_size for _, _size, _ in list_entry)
+    for _, _size, _path in sorted(list_entry, key=lambda x: x[0]):
+        if _total <= _parse_cache_max_bytes:
+            break
+        _path.unlink(missing_ok=True)
+        _total -= _size
 
 
 def saveFDS(path: str, wl: np.ndarray, data: np.ndarray, header: FdsHeader) -> None:
-    bool_scanmode_em = "蛍光" in header.ScanMode or "Em" in header.ScanMode
-    alias = FdsHeaderAlias(header.Language, bool_scanmode_em)
+    """
+    path: ファイルパス、またはテキストストリーム（閉じない）
+    header.RawLines がある場合（loadFDS で読み込んだヘッダー）は元のヘッダーの行をそのまま書き出し、
+    値の変わった行（CorrSpectra など）と装置関数の欄のみ書き換える
+    """
+    if header.MeasType == "3次元" or header.MeasType == "3-D scan":
+        with FdsWriter(path, header, wl[0]) as writer:
+            writer.write_block(wl[1], data)
+    else:
+        with FdsWriter(path, header) as writer:
+            writer.write_block(wl, data)
 
-    with open(path, mode='w') as f:
-        f.write(alias.SampleName + ":\t" + header.SampleName + "\n")
-        f.write(alias.FileName + ":\t" + header.FileName + "\n")
-        f.write(alias.MeasureDate + ":\t" + header.MeasureDate + "\n")
-        f.write(alias.Operator + ":\t" + header.Operator + "\n")
-        f.write(alias.Comment + ":\t" + header.Comment + "\n")
 
-        if header.Language == "EN":
-            f.write("\nInstrument\n")
-        elif header.Language == "JP":
-            f.write("\n光度計\n")
+class FdsWriter:
+    """
+    FdsWriter
+    FDSファイルをヘッダー → データリストの順に書き出すクラス
+    write_block で数行ずつ書き出せる（読み込みと並行して書き出す用途）
 
-        f.write(alias.Model + ":\t" + header.Model + "\n")
-        f.write(alias.SerialNum + ":\t" + header.SerialNum + "\n")
-        f.write(alias.RomVer + ":\t" + header.RomVer + "\n")
-        if header.Accessory != "":
-            f.write(alias.Accessory + ":\t" + header.Accessory + "\n")
+        with FdsWriter(path, header, wl_ex) as writer:
+            for wl_em, data in blocks:
+                writer.write_block(wl_em, data)
 
+    path にテキストストリーム（io.StringIO など）を渡した場合は、そこに書き出す（close で閉じない）
+
+    2026 10 18 created (split from saveFDS)
+    """
+
+    def __init__(self, path: str, header: FdsHeader, wl_ex: np.ndarray = None) -> None:
+        self.header = header
+        self.is_3d = header.MeasType == "3次元" or header.MeasType == "3-D scan"
+        self.is_wlscan = header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan"
+        self._own_file = not hasattr(path, "write")
+        self.path = path if self._own_file else None
+        self._t_open = None if _io_hook is None or not self._own_file else time.perf_counter()
+        self.f = open(path, mode='w', buffering=WRITE_BUFFER_SIZE) if self._own_file else path
+        self._closed = False
+        try:
+            _write_header(self.f, header)
+            if self.is_3d:
+                self.f.write(("\t%.3f" * len(wl_ex)) % tuple(np.asarray(wl_ex, dtype=float).tolist()) + "\n")
+        except BaseException:
+            self._t_open = None
+            self.close()
+            raise
+
+    def write_block(self, wl: np.ndarray, data: np.ndarray) -> None:
+        """
+        Wavelength scan: wl (N,), data (N,)
+        3-D scan: wl = wl_em (N,), data (N, N_ex)
+        """
+        if not (self.is_wlscan or self.is_3d):
+            return
+        wl = np.asarray(wl, dtype=float)
+        data = np.asarray(data, dtype=float).reshape(len(wl), -1)
+        for _i in range(0, len(wl), WRITE_BLOCK_ROWS):
+            self.f.write(format_rows(wl[_i:_i + WRITE_BLOCK_ROWS], data[_i:_i + WRITE_BLOCK_ROWS]))
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if not self._own_file:
+            return
+        self.f.close()
+        if self._t_open is not None and _io_hook is not None:
+            _io_hook("write", "FdsWriter", str(self.path), os.path.getsize(self.path), time.perf_counter() - self._t_open)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _write_header(f, header: FdsHeader) -> None:
+    if header.RawLines is not None:
+        f.write("".join(_patch_header_lines(header)))
         if header.Language == "EN":
-            f.write("\nInstrument parameters\n")
+            f.write("Data points\n")
         elif header.Language == "JP":
-            f.write("\n装置条件\n")
-
-        f.write(alias.MeasType + ":\t" + header.MeasType + "\n")
-        if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
-            f.write(alias.ScanMode + ":\t" + header.ScanMode + "\n")
-        f.write(alias.DataMode + ":\t" + header.DataMode + "\n")
+            f.write("ﾃﾞｰﾀﾘｽﾄ\n")
         if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
-            f.write(alias.FixWL + ":\t" + header.FixWL + "\n")
-            if header.ScanMode == "励起ｽﾍﾟｸﾄﾙ" or header.ScanMode == "Excitation":
-                f.write(alias.ScanExStartWL + ":\t" + header.ScanExStartWL + "\n")
-                f.write(alias.ScanExEndWL + ":\t" + header.ScanExEndWL + "\n")
-            if header.ScanMode == "蛍光ｽﾍﾟｸﾄﾙ" or header.ScanMode == "Emission":
-                f.write(alias.ScanEmStartWL + ":\t" + header.ScanEmStartWL + "\n")
-                f.write(alias.ScanEmEndWL + ":\t" + header.ScanEmEndWL + "\n")
-        elif header.MeasType == "3次元" or header.MeasType == "3-D scan":
+            f.write("nm\tData\n")
+        return
+
+    bool_scanmode_em = "蛍光" in header.ScanMode or "Em" in header.ScanMode
+    alias = get_header_alias(header.Language, bool_scanmode_em)
+
+    f.write(alias.SampleName + ":\t" + header.SampleName + "\n")
+    f.write(alias.FileName + ":\t" + header.FileName + "\n")
+    f.write(alias.MeasureDate + ":\t" + header.MeasureDate + "\n")
+    f.write(alias.Operator + ":\t" + header.Operator + "\n")
+    f.write(alias.Comment + ":\t" + header.Comment + "\n")
+
+    if header.Language == "EN":
+        f.write("\nInstrument\n")
+    elif header.Language == "JP":
+        f.write("\n光度計\n")
+
+    f.write(alias.Model + ":\t" + header.Model + "\n")
+    f.write(alias.SerialNum + ":\t" + header.SerialNum + "\n")
+    f.write(alias.RomVer + ":\t" + header.RomVer + "\n")
+    if header.Accessory != "":
+        f.write(alias.Accessory + ":\t" + header.Accessory + "\n")
+
+    if header.Language == "EN":
+        f.write("\nInstrument parameters\n")
+    elif header.Language == "JP":
+        f.write("\n装置条件\n")
+
+    f.write(alias.MeasType + ":\t" + header.MeasType + "\n")
+    if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
+        f.write(alias.ScanMode + ":\t" + header.ScanMode + "\n")
+    f.write(alias.DataMode + ":\t" + header.DataMode + "\n")
+    if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
+        f.write(alias.FixWL + ":\t" + header.FixWL + "\n")
+        if header.ScanMode == "励起ｽﾍﾟｸﾄﾙ" or header.ScanMode == "Excitation":
             f.write(alias.ScanExStartWL + ":\t" + header.ScanExStartWL + "\n")
             f.write(alias.ScanExEndWL + ":\t" + header.ScanExEndWL + "\n")
-            f.write(alias.ScanExStepWL + ":\t" + header.ScanExStepWL + "\n")
+        if header.ScanMode == "蛍光ｽﾍﾟｸﾄﾙ" or header.ScanMode == "Emission":
             f.write(alias.ScanEmStartWL + ":\t" + header.ScanEmStartWL + "\n")
             f.write(alias.ScanEmEndWL + ":\t" + header.ScanEmEndWL + "\n")
-            f.write(alias.ScanEmStepWL + ":\t" + header.ScanEmStepWL + "\n")
-
-        f.write(alias.ScanSpeed + ":\t" + header.ScanSpeed + "\n")
-        if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
-            f.write(alias.Delay + ":\t" + header.Delay + "\n")
-        f.write(alias.ExSlit + ":\t" + header.ExSlit + "\n")
-        f.write(alias.EmSlit + ":\t" + header.EmSlit + "\n")
-        f.write(alias.PMTVolt + ":\t" + header.PMTVolt + "\n")
-        f.write(alias.ResponseAT + ":\t" + header.ResponseAT + " \n")
-        str_corrspectra = "On" if header.CorrSpectra else "Off"
-        f.write(alias.CorrSpectra + ":\t" + str_corrspectra + "\n")
-        if header.Language == "JP":
-            str_shutterctrl = "On" if header.ShutterCtrl else "Off"
-            f.write(alias.ShutterCtrl + ":\t" + str_shutterctrl + "\n")
-        elif header.Language == "EN" and header.ShutterCtrl:
-            f.write(alias.ShutterCtrl + ":\tOn\n")
-
-        if header.MeasType == "3次元" or header.MeasType == "3-D scan":
-            f.write(alias.ContourStep + ":\t" + header.ContourStep + "\n")
-
-        if header.CorrSpectra and header.Language == "JP":
-            f.write("\n装置関数")
-            str_instrument = header.Instrument.output()
-            f.write(str_instrument + "\n")
+    elif header.MeasType == "3次元" or header.MeasType == "3-D scan":
+        f.write(alias.ScanExStartWL + ":\t" + header.ScanExStartWL + "\n")
+        f.write(alias.ScanExEndWL + ":\t" + header.ScanExEndWL + "\n")
+        f.write(alias.ScanExStepWL + ":\t" + header.ScanExStepWL + "\n")
+        f.write(alias.ScanEmStartWL + ":\t" + header.ScanEmStartWL + "\n")
+        f.write(alias.ScanEmEndWL + ":\t" + header.ScanEmEndWL + "\n")
+        f.write(alias.ScanEmStepWL + ":\t" + header.ScanEmStepWL + "\n")
+
+    f.write(alias.ScanSpeed + ":\t" + header.ScanSpeed + "\n")
+    if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
+        f.write(alias.Delay + ":\t" + header.Delay + "\n")
+    f.write(alias.ExSlit + ":\t" + header.ExSlit + "\n")
+    f.write(alias.EmSlit + ":\t" + header.EmSlit + "\n")
+    f.write(alias.PMTVolt + ":\t" + header.PMTVolt + "\n")
+    f.write(alias.ResponseAT + ":\t" + header.ResponseAT + " \n")
+    str_corrspectra = "On" if header.CorrSpectra else "Off"
+    f.write(alias.CorrSpectra + ":\t" + str_corrspectra + "\n")
+    if header.Language == "JP":
+        str_shutterctrl = "On" if header.ShutterCtrl else "Off"
+        f.write(alias.ShutterCtrl + ":\t" + str_shutterctrl + "\n")
+    elif header.Language == "EN" and header.ShutterCtrl:
+        f.write(alias.ShutterCtrl + ":\tOn\n")
+
+    if header.MeasType == "3次元" or header.MeasType == "3-D scan":
+        f.write(alias.ContourStep + ":\t" + header.ContourStep + "\n")
+
+    if header.CorrSpectra and header.Language == "JP":
+        f.write("\n装置関数")
+        str_instrument = header.Instrument.output()
+        f.write(str_instrument + "\n")
+
+    if header.Language == "EN":
+        f.write("\nData points\n")
+    elif header.Language == "JP":
+        f.write("\nﾃﾞｰﾀﾘｽﾄ\n")
 
-        if header.Language == "EN":
-            f.write("\nData points\n")
-        elif header.Language == "JP":
-            f.write("\nﾃﾞｰﾀﾘｽﾄ\n")
+    if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
+        f.write("nm\tData\n")
 
-        if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
-            f.write("nm\tData\n")
 
-        if header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan":
-            for wlwl in range(len(wl)):
-                f.write("{:.1f}\t".format(wl[wlwl]))
-                f.write(val2str(data[wlwl]) + "\n")
-        if header.MeasType == "3次元" or header.MeasType == "3-D scan":
-            for _wl_ex in wl[0]:
-                f.write("\t{:.3f}".format(_wl_ex))
-            f.write("\n")
-            for _i_em in range(len(wl[1])):
-                f.write("{:.1f}".format(wl[1][_i_em]))
-                for _i_ex in range(len(wl[0])):
-                    f.write("\t{}".format(val2str(data[_i_em, _i_ex])))
-                f.write("\n")
+def _patch_header_lines(header: FdsHeader):
+    """
+    header.RawLines のうち、読み込んだ時から値の変わった項目の行を書き換える
+    装置関数の欄は _write_header と同じく、JP で CorrSpectra On の場合のみ書き出す
+    （値が変わっていなければ元の行のまま）
+    ShutterCtrl の行が無く、_write_header では書き出す場合は CorrSpectra の行の次に加える
+    """
+    lines = header.RawLines
+    grammar = get_header_grammar(header.Language)
+    with_inst = header.CorrSpectra and header.Language == "JP"
+    out = []
+    _i_corr = None
+    _has_shutter = False
+    _has_inst = False
+    _i = 0
+    while _i < len(lines):
+        line = lines[_i]
+        if line.rstrip() == "装置関数":
+            _end = _i + 1
+            while _end < len(lines) and lines[_end].rstrip() != "":
+                _end += 1
+            _has_inst = True
+            if with_inst:
+                out += _patch_instrument_block(header, lines[_i:_end])
+            elif out and out[-1].strip() == "":
+                # 装置関数の欄の前の空行も除く
+                out.pop()
+            _i = _end
+            continue
+
+        _buf = line.split(':\t')
+        _att = grammar.get(_buf[0])
+        if _att == "ScanMode":
+            if "励起" in _buf[1] or "Excitation" in _buf[1]:
+                grammar = get_header_grammar(header.Language, False)
+            elif "蛍光" in _buf[1] or "Emission" in _buf[1]:
+                grammar = get_header_grammar(header.Language, True)
+        if len(_buf) >= 2 and _att is not None and _buf[1] != '\n':
+            _parsed = FdsHeader()
+            _parsed.parseString(_att, _buf[1])
+            if getattr(_parsed, _att) != getattr(header, _att):
+                line = _header_line(_buf[0], _att, getattr(header, _att))
+        if _att == "CorrSpectra":
+            _i_corr = len(out)
+        elif _att == "ShutterCtrl":
+            _has_shutter = True
+        out.append(line)
+        _i += 1
+
+    if not _has_shutter and _i_corr is not None and (header.Language == "JP" or header.ShutterCtrl):
+        _alias = get_header_alias(header.Language)
+        out.insert(_i_corr + 1, _header_line(_alias.ShutterCtrl, "ShutterCtrl", header.ShutterCtrl))
+    if with_inst and not _has_inst:
+        # 末尾（データリストの前）の空行の手前に加える
+        _n_blank = 0
+        while _n_blank < len(out) and out[-1 - _n_blank].strip() == "":
+            _n_blank += 1
+        out[len(out) - _n_blank:len(out) - _n_blank] = ["\n"] + _instrument_block(header)
+        if _n_blank == 0:
+            out.append("\n")
+    return out
+
+
+def _header_line(label: str, att: str, value) -> str:
+    if att == "CorrSpectra" or att == "ShutterCtrl":
+        value = "On" if value else "Off"
+    # _write_header と同じく ResponseAT の後には空白がある
+    return label + ":\t" + str(value) + (" \n" if att == "ResponseAT" else "\n")
+
+
+def _instrument_block(header: FdsHeader):
+    return ("装置関数" + header.Instrument.output() + "\n").splitlines(keepends=True)
+
+
+def _patch_instrument_block(header: FdsHeader, block):
+    _parsed = FdsHeader()
+    for line in block[1:]:
+        _parsed.parse_instrument_param(line)
+    if vars(_parsed.Instrument) == vars(header.Instrument):
+        return block
+    return _instrument_block(header)
 
 
 def val2str(val):
@@ -413,6 +943,47 @@ def val2str(val):
     return _buf
 
 
+# format_rows で使う書式（val2str と同じ結果になるように選ぶ）
+#   0-2: 1000未満の正の値を先頭5文字に切り捨てたもの (1.234 / 12.34 / 123.4), 3: 999.9999995以上1000未満
+#   4: 負の値 "{:.6f}", 5: "{:.0f}", 6: 9999.8超, 2: 波長 "{:.1f}"
+_ROW_FORMATS = np.array(["%.3f", "%.2f", "%.1f", "1000.", "%.6f", "%.0f", "9999.9"], dtype=object)
+_ROW_LITERALS = (3, 6)
+
+
+def format_rows(wl: np.ndarray, data: np.ndarray) -> str:
+    """
+    データリストの行 ("{:.1f}".format(wl) + "\t" + val2str(data) ...) をまとめて文字列にする
+    val2str と同じ結果（丸め・切り捨て）になる
+
+    wl: (N,), data: (N, M)
+    """
+    if len(wl) == 0:
+        return ""
+    data = np.array(data, dtype=float)
+    _codes = np.where(data > 9999.8, 6, np.where(data < 1000, 4, 5))
+
+    # 1000未満の正の値: "{:.6f}" の整数表現 (x 1e6) を求め、先頭5文字になるよう切り捨てる
+    _pos = (_codes == 4) & ~np.signbit(data)
+    _x = data[_pos] * 1e6
+    _n = np.rint(_x)
+    # 0.5 付近は浮動小数点の誤差で丸めが変わりうるので文字列で確認
+    _near_half = np.abs(_x - np.floor(_x) - 0.5) < 1e-6
+    if np.any(_near_half):
+        _n[_near_half] = [float(("%.6f" % _v).replace(".", "")) for _v in data[_pos][_near_half].tolist()]
+    _n = _n.astype(np.int64)
+    _code_pos = np.searchsorted(np.array([10 ** 7, 10 ** 8, 10 ** 9]), _n, side="right")
+    _digits = 3 - np.minimum(_code_pos, 2)
+    data[_pos] = (_n // 10 ** (6 - _digits)) / 10.0 ** _digits
+    _codes[_pos] = _code_pos
+
+    _codes = np.column_stack([np.full(len(wl), 2), _codes])
+    _values = np.column_stack([wl, data])
+    # 固定文字列の書式には値を渡さない
+    _args = tuple(_values[~np.isin(_codes, _ROW_LITERALS)].tolist())
+    _fmt = "\n".join(["\t".join(_row) for _row in _ROW_FORMATS[_codes].tolist()]) + "\n"
+    return _fmt % _args
+
+
 def getKeyFromValue(dic, val):
     keys = [k for k, v in dic.items() if v == val]
     if keys:
@@ -420,29 +991,130 @@ def getKeyFromValue(dic, val):
     return None
 
 
+def parseFDS_DataList(text: str, header: FdsHeader):
+    """
+    データリスト部分（"Data points" / "ﾃﾞｰﾀﾘｽﾄ" の次の行以降）を一括で数値に変換する
+
+    Returns
+    -------
+    Wavelength scan: wl, data
+    3-D scan: (wl_ex, wl_em), data
+    """
+    is_3d = header.MeasType == "3次元" or header.MeasType == "3-D scan"
+    if not is_3d and not (header.MeasType == "波長ｽｷｬﾝ" or header.MeasType == "Wavelength scan"):
+        return None, None
+
+    # 1行目: 3-D scan は励起波長の並び、Wavelength scan は "nm\tData"
+    # 大きな文字列のコピーを増やさないよう、前後の空白は位置だけ求める
+    _start = 0
+    while _start < len(text) and text[_start].isspace():
+        _start += 1
+    _end = len(text)
+    while _end > _start and text[_end - 1].isspace():
+        _end -= 1
+    _nl = text.find("\n", _start, _end)
+    _nl = _end if _nl < 0 else _nl
+    _first = text[_start:_nl]
+    if is_3d:
+        wl_ex = np.array(_first.split(), dtype=float)
+        n_cols = wl_ex.size + 1
+        _body = text[_nl + 1:_end]
+    else:
+        n_cols = 2
+        _body = text[_nl + 1:_end] if _first.split()[:1] == ["nm"] else text[_start:_end]
+
+    mat_data = _parse_values(_body, n_cols, _expected_rows(header) if is_3d else None)
+    if mat_data is None:
+        # 空行や "nm" 行が混在するなど、一括変換できない場合は一行ずつ読む
+        list_data = _parse_data_lines(text.splitlines())
+        if is_3d:
+            list_data.pop(0)
+        mat_data = np.stack(list_data)
+
+    if is_3d:
+        return (wl_ex, mat_data[:, 0]), mat_data[:, 1:]
+    return mat_data[:, 0], mat_data[:, 1]
+
+
+def _expected_rows(header: FdsHeader):
+    """蛍光側の開始・終了波長とサンプリング間隔から行数を求める（不明ならNone）"""
+    try:
+        _start = float(header.ScanEmStartWL.split()[0])
+        _end = float(header.ScanEmEndWL.split()[0])
+        _step = float(header.ScanEmStepWL.split()[0])
+        return int(round((_end - _start) / _step)) + 1
+    except (AttributeError, IndexError, ValueError, ZeroDivisionError, OverflowError):
+        return None
+
+
+def _parse_values(body: str, n_cols: int, n_rows: int = None):
+    """
+    タブ区切りの数値を np.fromstring で一括変換し (N, n_cols) にする
+    body は前後の空白を除いたもの（空行を含まない前提、含む場合は None）
+    n_rows : ヘッダーから求めた行数（_expected_rows）、行の数と違う場合は行の数を使う
+    変換できない場合は None
+
+    2026 10 18 warnings を使わずに数値以外を判定する（catch_warnings はスレッドセーフでない）
+        数値以外があると np.fromstring はそこで止まる（途中までの結果、DeprecationWarning）ので、
+        変換できた数で判定する
+        count を指定して出力サイズを確保すると、数値以外の位置にも値が入り判定できないため指定しない
+        （count なしでも確保は出力の大きさ程度）
+    """
+    if body == "":
+        return None
+    n_lines = body.count("\n") + 1
+    if n_rows is None or n_rows != n_lines:
+        n_rows = n_lines
+    values = np.fromstring(body, dtype=float, sep=" ")
+    if values.size != n_rows * n_cols:
+        return None
+    return values.reshape(n_rows, n_cols)
+
+
+def _parse_data_lines(lines):
+    list_data = []
+    for line in lines:
+        buff = line.split()  # 読み込んだ行を\t (タブスペースのこと)や\n（改行のこと）で分割
+        if len(buff) == 0:
+            continue
+        if buff[0] == "nm":
+            continue
+        list_data.append(np.array(buff, dtype=float))
+    return list_data
+
+
 def loadFDS_DataList(path):
     """
     load only Datalist
     """
+    if _io_hook is None:
+        return _load_fds_datalist(path)
+    _t = time.perf_counter()
+    _result = _load_fds_datalist(path)
+    _io_hook("read", "loadFDS_DataList", str(path), os.path.getsize(path), time.perf_counter() - _t)
+    return _result
+
 
-    flag_data = False
+def _load_fds_datalist(path):
 
     with open(path, "r") as f:
-        lines = f.readlines()
+        line = f.readline()
+        while line and line[:2] != "nm":  # その行の先頭2文字を確認して "nm" と一致するかチェック
+            line = f.readline()
+        text = f.read()  # 一致してたらその次の行からデータリスト内と判断
+
+    mat_data = _parse_values(text.strip(), 2)
+    if mat_data is not None:
+        return mat_data[:, 0].copy(), mat_data[:, 1].copy()
 
     wl = []    # 格納する変数を宣言
     data = []  # []は 中身のないリスト
 
-    for line in lines:
-        # linesを一行ずつlineに格納して以下を実行
-        if flag_data:  # もしデータリストだったら
-            buff = line.split()  # 読み込んだ行を\t (タブスペースのこと)や\n（改行のこと）で分割
-            if len(buff) == 2:   # 要素数が2つなら（データリスト内は 波長\t透過率\t\n）で保存されている
-                wl.append(float(buff[0]))    # 0番目の要素を数値と解釈してwlのリストに追加
-                data.append(float(buff[1]))  # 1番目の要素を数値と解釈してdataのリストに追加
-        else:  # まだデータリストでなかったら
-            if line[:2] == "nm":  # その行の先頭2文字を確認して "nm" と一致するかチェック
-                flag_data = True  # 一致してたらその次の行からデータリスト内と判断
+    for line in text.splitlines():
+        buff = line.split()
+        if len(buff) == 2:   # 要素数が2つなら（データリスト内は 波長\t透過率\t\n）で保存されている
+            wl.append(float(buff[0]))    # 0番目の要素を数値と解釈してwlのリストに追加
+            data.append(float(buff[1]))  # 1番目の要素を数値と解釈してdataのリストに追加
 
     return np.asarray(wl), np.asarray(data)
 
@@ -1,6 +1,15 @@
-from pathlib import Path
-from subprocess import Popen
-from PySide6.QtWidgets import (
+import time
+# プロセスの作成時刻が取れない場合の起動時刻（import の開始）
+_T_IMPORT = time.time()
+import copy  # noqa: E402
+import multiprocessing  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+import traceback  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import TYPE_CHECKING  # noqa: E402
+from PySide6.QtWidgets import (  # noqa: E402
     QApplication,
     QMainWindow,
     QWidget,
@@ -14,13 +23,103 @@ from PySide6.QtWidgets import (
     QRadioButton,
     QFrame,
     QFileDialog,
-    QMessageBox
+    QMessageBox,
+    QProgressBar,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QAbstractItemView
 )
-from PySide6.QtCore import QTranslator, QLocale, QLibraryInfo
-from module_fds import loadFDS
-from module_calibration import Calibrator
+from PySide6.QtCore import QTranslator, QLocale, QLibraryInfo, QObject, QRunnable, QThreadPool, QTimer, Signal  # noqa: E402
+# numpy を使うモジュール（module_fds, module_calibration, module_cli）は起動を速くするため
+# 使う時に import する（ウィンドウ表示後に preload_modules で読み込んでおく）
+if TYPE_CHECKING:
+    from module_calibration import Calibrator, CalibrationResult
 
 LOCALIZE_JP = False
+# これ以上のファイルはプロセスプールではなく calibrate_stream で補正する（ブロックごとに進捗・中止）
+STREAM_FILE_SIZE = 8 * 1024 * 1024
+# 進捗バーの1ファイル分
+PROGRESS_PER_FILE = 1000
+# 起動時間の計測（"1": 標準エラー出力、それ以外: 追記するログファイルのパス）
+# python module_gui_calibration.py --startup-time でも "1" になる
+STARTUP_TIME_ENV = "F7000_STARTUP_TIME"
+# 起動の開始時刻（最初の log_startup_time で process_start_time から求める）
+_T_START = None
+
+
+def process_start_time() -> float:
+    """
+    起動の開始時刻 (time.time() と同じ epoch 秒)
+    プロセスの作成時刻（Windows: GetProcessTimes、Linux: /proc）、取れない場合は import の開始時刻
+    PyInstaller の --onefile では展開する親プロセス（ブートローダー）の作成時刻
+    """
+    _pid = os.getppid() if _is_onefile() else os.getpid()
+    try:
+        if sys.platform == "win32":
+            return _process_start_time_win(_pid)
+        with open("/proc/{0:d}/stat".format(_pid), "rb") as f:
+            # comm（括弧内）は空白を含むことがあるので ")" の後から数える、starttime は22番目
+            _ticks = int(f.read().rsplit(b")", 1)[1].split()[19])
+        with open("/proc/uptime", "rb") as f:
+            _uptime = float(f.read().split()[0])
+        return time.time() - _uptime + _ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return _T_IMPORT
+
+
+def _is_onefile() -> bool:
+    """
+    PyInstaller の --onefile（一時フォルダに展開して子プロセスで実行する）
+    --onedir（PyInstaller 6 以降は _MEIPASS が exe のフォルダの _internal）、cx_Freeze（_MEIPASS がない）は False
+    """
+    if not getattr(sys, "frozen", False) or not hasattr(sys, "_MEIPASS"):
+        return False
+    _dir_bundle = Path(sys._MEIPASS).resolve()
+    _dir_exe = Path(sys.executable).resolve().parent
+    return _dir_bundle != _dir_exe and _dir_exe not in _dir_bundle.parents
+
+
+def _process_start_time_win(pid: int) -> float:
+    import ctypes
+    from ctypes import wintypes
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.OpenProcess.restype = wintypes.HANDLE
+    # PROCESS_QUERY_LIMITED_INFORMATION
+    _handle = _kernel32.OpenProcess(0x1000, False, pid)
+    if not _handle:
+        raise OSError(ctypes.get_last_error(), "OpenProcess")
+    try:
+        _times = [wintypes.FILETIME() for _ in range(4)]
+        if not _kernel32.GetProcessTimes(_handle, *[ctypes.byref(_t) for _t in _times]):
+            raise OSError(ctypes.get_last_error(), "GetProcessTimes")
+    finally:
+        _kernel32.CloseHandle(_handle)
+    # 1601-01-01 からの 100 ns 単位
+    _created = (_times[0].dwHighDateTime << 32) | _times[0].dwLowDateTime
+    return _created / 1e7 - 11644473600
+
+
+def log_startup_time(stage: str):
+    _dest = os.environ.get(STARTUP_TIME_ENV, "")
+    if _dest == "":
+        return
+    global _T_START
+    if _T_START is None:
+        _T_START = process_start_time()
+    _msg = "startup {0}: {1:.3f} s".format(stage, time.time() - _T_START)
+    if _dest == "1":
+        # --noconsole でビルドした場合は標準エラー出力がない
+        if sys.stderr is not None:
+            print(_msg, file=sys.stderr)
+        return
+    with open(_dest, "a", encoding="utf-8") as f:
+        f.write(_msg + "\n")
+
+
+def preload_modules():
+    import module_calibration  # noqa: F401
+    import module_cli  # noqa: F401
 
 
 class VerticalLine(QFrame):
@@ -30,13 +129,181 @@ class VerticalLine(QFrame):
         self.setFrameShadow(QFrame.Sunken)
 
 
+class WorkerSignals(QObject):
+    # done, total (0: unknown)
+    progress = Signal(int, int)
+    # CalibrationResult of each file (with_callback=True)
+    result = Signal(object)
+    finished = Signal(object)
+    failed = Signal(object)
+
+
+class Worker(QRunnable):
+    """
+    QThreadPool で func(*args, **kwargs) を実行し、結果を signals で返す
+    func が progress, cancel_event を受け取る場合は with_progress=True
+    func が callback（ファイルごとの結果）を受け取る場合は with_callback=True
+    """
+
+    def __init__(self, func, *args, with_progress: bool = False, with_callback: bool = False, **kwargs) -> None:
+        super().__init__()
+        # signals は Python 側で保持する（run の終了後に削除されないように）
+        self.setAutoDelete(False)
+        self.signals = WorkerSignals()
+        self.cancel_event = threading.Event()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        if with_progress:
+            self.kwargs["progress"] = self._emit_progress
+            self.kwargs["cancel_event"] = self.cancel_event
+        if with_callback:
+            self.kwargs["callback"] = self.signals.result.emit
+
+    def run(self):
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:  # noqa
+            from module_calibration import CalibrationCancelled
+            if not isinstance(e, CalibrationCancelled):
+                traceback.print_exc()
+            self.signals.failed.emit(e)
+            return
+        self.signals.finished.emit(result)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _emit_progress(self, n_done, n_total):
+        self.signals.progress.emit(n_done, 0 if n_total is None else n_total)
+
+
+def calibrate_queue(
+        calibrator: "Calibrator", filepaths, bool_off_to_on=None, dir_output=None, jobs: int = None,
+        callback=None, progress=None, cancel_event=None):
+    """
+    filepaths をまとめて補正する
+    - STREAM_FILE_SIZE 以上のファイル、並列にする意味がない場合（1ファイル、jobs=1）は
+      Calibrator.calibrate_stream で1つずつ補正する（ブロックごとに進捗を返し、中止できる）
+    - その他は1つのプロセスプールで並列に補正する（Calibrator.calibrate_many、中止はファイルの間）
+
+    dir_output : None の場合は入力ファイルと同じフォルダに出力する
+    progress : (done, total) で呼ばれる（1ファイルを PROGRESS_PER_FILE とする）
+
+    Returns
+    -------
+    list of CalibrationResult
+    """
+    from module_calibration import CalibrationResult, CalibrationCancelled
+    if not calibrator.flag_inst_func:
+        raise ValueError("instrumental Function is not loaded")
+    filepaths = list(filepaths)
+    _n_total = len(filepaths) * PROGRESS_PER_FILE
+    _n_done = [0]
+    results = []
+
+    def _callback(result: "CalibrationResult"):
+        results.append(result)
+        _n_done[0] += PROGRESS_PER_FILE
+        if callback is not None:
+            callback(result)
+        if progress is not None:
+            progress(_n_done[0], _n_total)
+
+    def _progress_stream(n_rows, n_rows_total):
+        if progress is not None and n_rows_total:
+            progress(_n_done[0] + PROGRESS_PER_FILE * min(n_rows, n_rows_total) // n_rows_total, _n_total)
+
+    _stream = {_path for _path in filepaths if _file_size(_path) >= STREAM_FILE_SIZE}
+    if jobs == 1 or len(filepaths) - len(_stream) < 2:
+        _stream = set(filepaths)
+
+    def _run(calibrator_group, paths, callback_group):
+        _results = {}
+        _paths_pool = [_path for _path in paths if _path not in _stream]
+        if _paths_pool:
+            _results.update(zip(_paths_pool, calibrator_group._calibrate_many(
+                _paths_pool, bool_off_to_on, jobs, callback_group, executor, cancel_event)))
+        for _path in paths:
+            if _path not in _stream:
+                continue
+            if cancel_event is not None and cancel_event.is_set():
+                _result = CalibrationResult(_path, error=CalibrationCancelled(_path))
+            else:
+                try:
+                    _path_output = calibrator_group.calibrate_stream(
+                        _path, bool_off_to_on, progress=_progress_stream, cancel_event=cancel_event)
+                    _result = CalibrationResult(_path, _path_output, stats=calibrator_group.last_stats)
+                except Exception as e:  # noqa
+                    _result = CalibrationResult(_path, error=e)
+            _results[_path] = _result
+            callback_group(_result)
+        return [_results[_path] for _path in paths]
+
+    # 入力と同じフォルダに出力する場合は、ドライブごとに共通のフォルダを出力・入力のルートにする
+    # （ファイルごとに入力と同じサブフォルダに書き出され、フォルダが違っても1回の補正になる）
+    _groups = {}
+    for _path in filepaths:
+        _groups.setdefault(Path(_path).anchor if dir_output is None else "", []).append(_path)
+
+    executor = None
+    if len(_stream) < len(filepaths):
+        executor = calibrator.make_executor(jobs)
+    try:
+        for _paths in _groups.values():
+            # 出力フォルダごとに Calibrator をコピーする（装置関数、プロセスプールは共有）
+            _calibrator = copy.copy(calibrator)
+            if dir_output is None:
+                _root = os.path.commonpath([str(Path(_path).parent) for _path in _paths])
+                _calibrator.set_output_dir(_root)
+                _calibrator.set_input_root(_root)
+            else:
+                _calibrator.set_output_dir(dir_output)
+            _calibrator.run_incremental(
+                lambda paths, callback_group: _run(_calibrator, paths, callback_group),
+                _paths, bool_off_to_on, _callback)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
+
+def read_corr_spectra(filepaths, callback=None, progress=None, cancel_event=None):
+    """
+    ヘッダーだけ読んで (path, "ON" / "OFF" / "?") を callback に渡す（キューの「補正」の列）
+    """
+    from module_fds import FdsFile
+    for _n, _path in enumerate(filepaths):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        # header only (data list is not parsed)
+        try:
+            header = FdsFile(_path).header
+        except (OSError, UnicodeDecodeError):
+            header = None
+        if header is None:
+            _corr = "?"
+        else:
+            _corr = "ON" if header.CorrSpectra else "OFF"
+        if callback is not None:
+            callback((_path, _corr))
+        if progress is not None:
+            progress(_n + 1, len(filepaths))
+
+
+def _file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
 class MainWindow(QMainWindow):
     def __init__(self, app: QApplication, parent=None) -> None:
         super().__init__(parent)
 
-        self.calibrator = Calibrator()
         self.app = app
-        self.core = CalibratorWidget(self, calibrator=self.calibrator)
+        self.core = CalibratorWidget(self)
 
         self.initUI()
 
@@ -45,16 +312,52 @@ class MainWindow(QMainWindow):
         # self.resize(1200, 800)
         self.setWindowTitle("蛍光分光光度計 スペクトル補正ツール")
 
+    @property
+    def calibrator(self):
+        return self.core.calibrator
+
     def start(self):
         self.show()
+        # イベントループが始まり、ウィンドウが表示された後に実行される
+        QTimer.singleShot(0, self.shown)
         self.app.exec()
 
+    def shown(self):
+        log_startup_time("window shown")
+        # 最初の操作で待たないように、補正用のモジュールを裏で読み込んでおく
+        self.worker_preload = Worker(preload_modules)
+        self.core.thread_pool.start(self.worker_preload)
+
+    def closeEvent(self, event):
+        # 実行中の補正は中止し、終わってから閉じる（UIを止めて待たない、書きかけの出力は削除される）
+        if self.core.is_busy() or self.core.workers_header:
+            self.core.close_when_idle = True
+            self.core.cancel_calibration()
+            for _worker in self.core.workers_header:
+                _worker.cancel()
+            self.core.le_message.setStyleSheet("color: black")
+            self.core.le_message.setText("中止しています（終わり次第閉じます）")
+            event.ignore()
+            return
+        super().closeEvent(event)
+
 
 class CalibratorWidget(QWidget):
-    def __init__(self, parent=None, calibrator: Calibrator = None):
+    def __init__(self, parent=None, calibrator: "Calibrator" = None):
         super().__init__(parent)
 
-        self.calibrator = Calibrator() if calibrator is None else calibrator
+        # None: 最初に使う時に作る（calibrator プロパティ）
+        self._calibrator = calibrator
+        self.thread_pool = QThreadPool.globalInstance()
+        # 実行中の Worker（None: なし）
+        self.worker_calib: Worker = None
+        self.worker_inst: Worker = None
+        # 補正するファイルのリスト（table_queue の行と同じ順）
+        self.queue = []
+        # True: 実行中の処理が終わったらウィンドウを閉じる（MainWindow.closeEvent）
+        self.close_when_idle = False
+        # キューに追加したファイルのヘッダーを読む Worker（add_to_queue）
+        self.workers_header = []
 
         lay_main_message = QVBoxLayout()
         lay_inout_inst = QHBoxLayout()
@@ -75,18 +378,42 @@ class CalibratorWidget(QWidget):
 
         self.update_start_buttton()
 
+    @property
+    def calibrator(self) -> "Calibrator":
+        if self._calibrator is None:
+            from module_calibration import Calibrator, INST_CACHE_DIR_DEFAULT
+            self._calibrator = Calibrator()
+            self._calibrator.set_inst_cache_dir(INST_CACHE_DIR_DEFAULT)
+        return self._calibrator
+
     def init_input_output_layout(self):
         lay_inout = QVBoxLayout()
 
-        self.le_input_filepath = QLineEdit("", self)
-        self.le_input_filepath.setPlaceholderText("Input File (*.txt)")
-        self.le_input_filepath.setMinimumWidth(200)
-        btn_input_filepath = QPushButton("選択", self)
-        btn_input_filepath.clicked.connect(self.btn_select_input_clicked)
-        lay_input_path = QHBoxLayout()
-        lay_input_path.addSpacing(20)
-        lay_input_path.addWidget(self.le_input_filepath)
-        lay_input_path.addWidget(btn_input_filepath)
+        self.table_queue = QTableWidget(0, 3, self)
+        self.table_queue.setHorizontalHeaderLabels(["ファイル", "補正", "状態"])
+        self.table_queue.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table_queue.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.table_queue.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        self.table_queue.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table_queue.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_queue.setMinimumWidth(400)
+        self.btn_add_files = QPushButton("ファイル追加", self)
+        self.btn_add_files.clicked.connect(self.btn_select_input_clicked)
+        self.btn_add_folder = QPushButton("フォルダ追加", self)
+        self.btn_add_folder.clicked.connect(self.btn_select_input_folder_clicked)
+        self.btn_remove_files = QPushButton("選択を削除", self)
+        self.btn_remove_files.clicked.connect(self.btn_remove_input_clicked)
+        self.btn_clear_files = QPushButton("クリア", self)
+        self.btn_clear_files.clicked.connect(self.btn_clear_input_clicked)
+        lay_input_buttons = QHBoxLayout()
+        lay_input_buttons.addWidget(self.btn_add_files)
+        lay_input_buttons.addWidget(self.btn_add_folder)
+        lay_input_buttons.addWidget(self.btn_remove_files)
+        lay_input_buttons.addWidget(self.btn_clear_files)
+        lay_input_buttons.addStretch()
+        lay_input_path = QVBoxLayout()
+        lay_input_path.addLayout(lay_input_buttons)
+        lay_input_path.addWidget(self.table_queue)
 
         self.le_output_filepath = QLineEdit("", self)
         self.le_output_filepath.setPlaceholderText("Output Directory")
@@ -114,19 +441,33 @@ class CalibratorWidget(QWidget):
         self.check_calib_auto.stateChanged.connect(self.update_correction_mode)
         self.rad_off_to_on.setChecked(True)
         self.check_calib_auto.setChecked(True)
+        self.check_interpolate = QCheckBox("装置関数にない波長は補間する", self)
+        self.check_interpolate.setChecked(False)
 
         lay_calib_v = QVBoxLayout()
         lay_calib_v.addWidget(self.rad_off_to_on)
         lay_calib_v.addWidget(self.rad_on_to_off)
         lay_calib_v.addWidget(self.check_calib_auto)
+        lay_calib_v.addWidget(self.check_interpolate)
         lay_calib = QHBoxLayout()
         lay_calib.addSpacing(20)
         lay_calib.addLayout(lay_calib_v)
 
-        self.btn_start = QPushButton("補正開始", self)
+        self.btn_start = QPushButton("一括補正開始", self)
         self.btn_start.clicked.connect(self.start_calibration)
+        self.btn_cancel = QPushButton("中止", self)
+        self.btn_cancel.clicked.connect(self.cancel_calibration)
+        self.btn_cancel.setEnabled(False)
 
         self.btn_start.setFixedWidth(300)
+        self.btn_cancel.setFixedWidth(80)
+        lay_start = QHBoxLayout()
+        lay_start.addWidget(self.btn_start)
+        lay_start.addWidget(self.btn_cancel)
+        lay_start.addStretch()
+        self.progress_calib = QProgressBar(self)
+        self.progress_calib.setFixedWidth(380)
+        self.progress_calib.setValue(0)
 
         lay_inout.addWidget(QLabel("入力ファイル"))
         lay_inout.addLayout(lay_input_path)
@@ -134,10 +475,10 @@ class CalibratorWidget(QWidget):
         lay_inout.addLayout(lay_output_path)
         lay_inout.addWidget(QLabel("スペクトル補正"))
         lay_inout.addLayout(lay_calib)
-        lay_inout.addWidget(self.btn_start)
+        lay_inout.addLayout(lay_start)
+        lay_inout.addWidget(self.progress_calib)
         lay_inout.addSpacing(20)
 
-        lay_inout.addStretch()
         return lay_inout
 
     def init_instrument_layout(self):
@@ -214,11 +555,11 @@ class CalibratorWidget(QWidget):
         lay_em_long_path.addWidget(self.btn_em_long_path)
 
         lay_import = QHBoxLayout()
-        btn_import = QPushButton("読み込み", self)
-        btn_import.setFixedWidth(120)
-        btn_import.clicked.connect(self.btn_import_inst)
+        self.btn_import = QPushButton("読み込み", self)
+        self.btn_import.setFixedWidth(120)
+        self.btn_import.clicked.connect(self.btn_import_inst)
         self.lbl_inst_status = QLabel("読み込まれていません", self)
-        lay_import.addWidget(btn_import)
+        lay_import.addWidget(self.btn_import)
         lay_import.addWidget(self.lbl_inst_status)
 
         lay_inst.addWidget(QLabel("装置関数 （チェックを外した箇所は無補正として扱います）"))
@@ -239,10 +580,75 @@ class CalibratorWidget(QWidget):
         return lay_inst
 
     def btn_select_input_clicked(self):
-        path, _ = QFileDialog.getOpenFileName(self, filter="テキストファイル (*.txt)")
-        self.le_input_filepath.setText(path)
-        self.update_output_dir()
-        self.update_correction_mode()
+        from module_fds import FDS_SUFFIXES
+        _patterns = " ".join("*{0} *{1}".format(_suffix, _suffix.upper()) for _suffix in FDS_SUFFIXES)
+        paths, _ = QFileDialog.getOpenFileNames(self, filter="FDSファイル ({0});;すべてのファイル (*)".format(_patterns))
+        self.add_to_queue(paths)
+
+    def btn_select_input_folder_clicked(self):
+        path = QFileDialog.getExistingDirectory(self)
+        if path != "":
+            from module_cli import expand_inputs
+            self.add_to_queue(expand_inputs([path]))
+
+    def btn_remove_input_clicked(self):
+        _rows = sorted({_index.row() for _index in self.table_queue.selectedIndexes()}, reverse=True)
+        for _row in _rows:
+            self.table_queue.removeRow(_row)
+            del self.queue[_row]
+        self.update_start_buttton()
+
+    def btn_clear_input_clicked(self):
+        self.table_queue.setRowCount(0)
+        self.queue = []
+        self.update_start_buttton()
+
+    def add_to_queue(self, filepaths):
+        """
+        行はすぐに追加し、「補正」の列（ヘッダーの CorrSpectra）は Worker で読んでから表示する
+        （ネットワーク上のファイルを多数追加しても UI を止めない）
+        """
+        _added = []
+        for _path in filepaths:
+            # ファイルにアクセスしない（resolve はネットワーク上で遅い）
+            _path = Path(os.path.abspath(_path)).as_posix()
+            if _path in self.queue:
+                continue
+            _row = self.table_queue.rowCount()
+            self.table_queue.insertRow(_row)
+            _item = QTableWidgetItem(Path(_path).name)
+            _item.setToolTip(_path)
+            self.table_queue.setItem(_row, 0, _item)
+            self.table_queue.setItem(_row, 1, QTableWidgetItem("…"))
+            self.table_queue.setItem(_row, 2, QTableWidgetItem("待機"))
+            self.queue.append(_path)
+            _added.append(_path)
+        self.update_start_buttton()
+        if not _added:
+            return
+
+        worker = Worker(read_corr_spectra, _added, with_progress=True, with_callback=True)
+        worker.signals.result.connect(self.update_queue_corr)
+        worker.signals.finished.connect(self.finished_read_headers)
+        worker.signals.failed.connect(self.finished_read_headers)
+        self.workers_header.append(worker)
+        self.thread_pool.start(worker)
+
+    def update_queue_corr(self, path_corr):
+        _path, _corr = path_corr
+        # 読み込み中に削除された行は飛ばす
+        if _path in self.queue:
+            self.table_queue.setItem(self.queue.index(_path), 1, QTableWidgetItem(_corr))
+
+    def finished_read_headers(self, _):
+        # 終わった Worker（signals が送り元）を除く
+        self.workers_header = [_worker for _worker in self.workers_header if _worker.signals is not self.sender()]
+        self.close_if_requested()
+
+    def set_queue_status(self, row: int, status: str, tooltip: str = ""):
+        _item = QTableWidgetItem(status)
+        _item.setToolTip(tooltip)
+        self.table_queue.setItem(row, 2, _item)
 
     def btn_select_output_clicked(self):
         path = QFileDialog.getExistingDirectory(self)
@@ -252,12 +658,7 @@ class CalibratorWidget(QWidget):
         _checked = self.check_output_filepath.isChecked()
         self.le_output_filepath.setEnabled(not _checked)
         self.btn_output_filepath.setEnabled(not _checked)
-        if not _checked:
-            return
-        _input_filepath = Path(self.le_input_filepath.text())
-        if _input_filepath.is_file():
-            _dir = _input_filepath.parent
-            self.le_output_filepath.setText(_dir.as_posix())
+        self.update_start_buttton()
 
     def check_output_dir(self, text):
         _path = Path(text)
@@ -268,66 +669,112 @@ class CalibratorWidget(QWidget):
         self.update_start_buttton()
 
     def update_correction_mode(self):
+        # 自動の場合はファイルごとに判定する（キューの「補正」の列）
         _is_auto = self.check_calib_auto.isChecked()
         self.rad_off_to_on.setEnabled(not _is_auto)
         self.rad_on_to_off.setEnabled(not _is_auto)
-        if not _is_auto:
-            return
-        _input_path = self.le_input_filepath.text()
-        if _input_path == "":
-            return
-        if not Path(_input_path).is_file():
-            return
-
-        _, _, header = loadFDS(_input_path)
-        if header.CorrSpectra:
-            self.rad_on_to_off.setChecked(True)
-        else:
-            self.rad_off_to_on.setChecked(True)
 
     def update_start_buttton(self):
-        _ok_inst, _ok_dir = self.calibrator.is_ready_detail()
-        _ready = _ok_inst and _ok_dir
-        _outputdir = Path(self.calibrator.output_dir).resolve().as_posix()
+        if self._calibrator is None:
+            _ok_inst, _ok_dir = False, False
+        else:
+            _ok_inst, _ok_dir = self.calibrator.is_ready_detail()
+        _same_dir = self.check_output_filepath.isChecked()
+        _ok_dir = _ok_dir or _same_dir
+        _ok_queue = len(self.queue) > 0
+        _ready = _ok_inst and _ok_dir and _ok_queue
+        _busy = self.is_busy()
+        self.btn_import.setEnabled(_busy is False)
+        self.btn_cancel.setEnabled(self.worker_calib is not None)
+        for _btn in [self.btn_add_files, self.btn_add_folder, self.btn_remove_files, self.btn_clear_files]:
+            _btn.setEnabled(self.worker_calib is None)
+        if _same_dir:
+            _outputdir = "入力と同じ"
+        else:
+            _outputdir = Path(self.calibrator.output_dir).resolve().as_posix()
         _msg_ready = "補正準備完了" if _ready else "補正準備ができていません"
         _msg_inst = "装置関数：完了" if _ok_inst else "装置関数を入力してください"
         _msg_dir = "出力フォルダ：{0}".format(_outputdir) if _ok_dir else "出力フォルダを指定してください"
-        self.btn_start.setEnabled(_ready)
+        _msg_queue = "{0} ファイル".format(len(self.queue)) if _ok_queue else "入力ファイルを追加してください"
+        self.btn_start.setEnabled(_ready and not _busy)
         _color = "green" if _ready else "red"
         self.le_message.setStyleSheet(f"color: {_color}")
-        self.le_message.setText(f"{_msg_ready}（{_msg_inst} ／ {_msg_dir}）")
+        self.le_message.setText(f"{_msg_ready}（{_msg_inst} ／ {_msg_dir} ／ {_msg_queue}）")
 
     def start_calibration(self):
-        _filepath_input = self.le_input_filepath.text()
-
         if self.check_calib_auto.isChecked():
             _bool_off_to_on = None
         else:
             _bool_off_to_on = self.grp_calib.checkedId() == 0
+        _dir_output = None if self.check_output_filepath.isChecked() else self.calibrator.output_dir
+        self.calibrator.set_interpolation(self.check_interpolate.isChecked())
+
+        for _row in range(len(self.queue)):
+            self.set_queue_status(_row, "待機")
+        # 補正はスレッド（＋プロセスプール）で実行し、結果は signals で受け取る
+        self.worker_calib = Worker(
+            calibrate_queue, self.calibrator, list(self.queue), _bool_off_to_on, _dir_output,
+            with_progress=True, with_callback=True)
+        self.worker_calib.signals.progress.connect(self.update_progress)
+        self.worker_calib.signals.result.connect(self.update_queue_result)
+        self.worker_calib.signals.finished.connect(self.finished_calibration)
+        self.worker_calib.signals.failed.connect(self.failed_calibration)
+        self.progress_calib.setRange(0, len(self.queue) * PROGRESS_PER_FILE)
+        self.progress_calib.setValue(0)
+        self.le_message.setStyleSheet("color: black")
+        self.le_message.setText(f"補正中: {len(self.queue)} ファイル")
+        self.update_start_buttton()
+        self.thread_pool.start(self.worker_calib)
+
+    def cancel_calibration(self):
+        if self.worker_calib is not None:
+            self.worker_calib.cancel()
+
+    def is_busy(self) -> bool:
+        return self.worker_calib is not None or self.worker_inst is not None
+
+    def close_if_requested(self):
+        if self.close_when_idle and not self.is_busy() and not self.workers_header:
+            self.window().close()
+
+    def update_progress(self, n_done, n_total):
+        if n_total > 0:
+            self.progress_calib.setRange(0, n_total)
+            self.progress_calib.setValue(min(n_done, n_total))
+
+    def update_queue_result(self, result: "CalibrationResult"):
+        from module_calibration import CalibrationCancelled
+        _row = self.queue.index(result.filepath_input)
+        if result.ok:
+            self.set_queue_status(_row, "完了", Path(result.filepath_output).resolve().as_posix())
+        elif isinstance(result.error, CalibrationCancelled):
+            self.set_queue_status(_row, "中止")
+        else:
+            self.set_queue_status(_row, "失敗", str(result.error))
+
+    def finished_calibration(self, results):
+        from module_calibration import CalibrationCancelled
+        self.worker_calib = None
+        self.update_start_buttton()
+        _n_ok = sum(_result.ok for _result in results)
+        _n_cancelled = sum(isinstance(_result.error, CalibrationCancelled) for _result in results)
+        _n_failed = len(results) - _n_ok - _n_cancelled
+        _color = "green" if _n_ok == len(results) else "red"
+        self.le_message.setStyleSheet(f"color: {_color}")
+        self.le_message.setText(f"スペクトル補正終了（完了 {_n_ok} ／ 失敗 {_n_failed} ／ 中止 {_n_cancelled}）")
+        self.close_if_requested()
 
-        if not Path(_filepath_input).is_file():
-            _ = QMessageBox.critical(
-                self,
-                "指定したファイルが存在しません",
-                "指定されたファイルが存在しません\n（アクセス権限による問題の可能性もあります）",
-                QMessageBox.Ok)
+    def failed_calibration(self, e: Exception):
+        self.worker_calib = None
+        self.update_start_buttton()
+        if self.close_when_idle:
+            self.close_if_requested()
             return
-        try:
-            _path_result: Path = self.calibrator.calibrate(_filepath_input, _bool_off_to_on)
-            btn_result = QMessageBox.information(
-                self,
-                "スペクトル補正完了",
-                f"スペクトル補正が完了しました。\n出力結果: {_path_result.resolve().as_posix()}",
-                QMessageBox.Open, QMessageBox.Ok)
-            if btn_result == QMessageBox.Open:
-                Popen(["explorer", str(_path_result.resolve().parent)], shell=True)
-        except Exception as e:  # noqa
-            QMessageBox.critical(
-                self,
-                "スペクトル補正失敗",
-                f"スペクトル補正が失敗しました。\nError: {e}\n\n連続する場合は担当者にご連絡ください。",
-                QMessageBox.Ok)
-            raise e
+        QMessageBox.critical(
+            self,
+            "スペクトル補正失敗",
+            f"スペクトル補正が失敗しました。\nError: {e}\n\n連続する場合は担当者にご連絡ください。",
+            QMessageBox.Ok)
 
     def update_exs_enable(self):
         bool_enable = self.check_ex_short.isChecked()
@@ -370,17 +817,34 @@ class CalibratorWidget(QWidget):
         path_ems = self.le_em_short_path.text() if self.check_em_short.isChecked() else None
         path_exl = self.le_ex_long_path.text() if self.check_ex_long.isChecked() else None
         path_eml = self.le_em_long_path.text() if self.check_em_long.isChecked() else None
-        try:
-            self.calibrator.set_mat_inst_func(path_exs, path_ems, path_exl, path_eml)
-            self.lbl_inst_status.setText("読み込みに成功しました")
-        except:  # noqa
-            self.lbl_inst_status.setText("読み込みに失敗しました")
-            self.calibrator.clear_mat_inst_func()
+        # 読み込み中は補正できない（Calibrator の装置関数を書き換えるため）
+        self.worker_inst = Worker(self.calibrator.set_mat_inst_func, path_exs, path_ems, path_exl, path_eml)
+        self.worker_inst.signals.finished.connect(self.finished_import_inst)
+        self.worker_inst.signals.failed.connect(self.failed_import_inst)
+        self.lbl_inst_status.setText("読み込み中...")
+        self.update_start_buttton()
+        self.thread_pool.start(self.worker_inst)
+
+    def finished_import_inst(self, _):
+        self.worker_inst = None
+        self.lbl_inst_status.setText("読み込みに成功しました")
+        self.update_start_buttton()
+        self.close_if_requested()
 
+    def failed_import_inst(self, _):
+        self.worker_inst = None
+        self.lbl_inst_status.setText("読み込みに失敗しました")
+        self.calibrator.clear_mat_inst_func()
         self.update_start_buttton()
+        self.close_if_requested()
 
 
 if __name__ == "__main__":
+    # 実行ファイル化した場合に、並列処理の子プロセスが GUI を起動しないように
+    multiprocessing.freeze_support()
+    if "--startup-time" in sys.argv:
+        os.environ.setdefault(STARTUP_TIME_ENV, "1")
+    log_startup_time("imports")
     app = QApplication()
     if LOCALIZE_JP:
         translator = QTranslator(app)
@@ -389,4 +853,5 @@ if __name__ == "__main__":
         translator.load('qt_%s' % locale, path)
         app.installTranslator(translator)
     window = MainWindow(app)
+    log_startup_time("window created")
     window.start()
@@ -13,7 +13,17 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # 使わないパッケージ・Qt のモジュール（setup.py の excludes と同じ）
+    excludes=[
+        'PyQt5', 'PySide2', 'pandas', 'tkinter', 'matplotlib', 'scipy', 'numba',
+        'PySide6.QtNetwork', 'PySide6.QtQml', 'PySide6.QtQuick', 'PySide6.QtQuickWidgets',
+        'PySide6.QtWebEngineCore', 'PySide6.QtWebEngineWidgets', 'PySide6.QtWebChannel', 'PySide6.QtWebSockets',
+        'PySide6.QtMultimedia', 'PySide6.QtMultimediaWidgets', 'PySide6.QtSql', 'PySide6.QtSvg',
+        'PySide6.QtPdf', 'PySide6.QtCharts', 'PySide6.QtDataVisualization', 'PySide6.QtOpenGL',
+        'PySide6.QtOpenGLWidgets', 'PySide6.Qt3DCore', 'PySide6.Qt3DRender', 'PySide6.QtBluetooth',
+        'PySide6.QtPositioning', 'PySide6.QtSensors', 'PySide6.QtSerialPort', 'PySide6.QtTest',
+        'PySide6.QtDesigner', 'PySide6.QtHelp', 'PySide6.QtUiTools', 'PySide6.QtXml',
+    ],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
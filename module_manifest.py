@@ -0,0 +1,176 @@
+"""
+CalibrationManifest
+    出力ファイルの由来（入力ファイルの内容のハッシュ、装置関数の fingerprint、補正の方向）を
+    SQLite に記録し、補正済みで最新の出力があるファイルを判定するクラス
+
+    - 入力のサイズ・更新日時が記録と同じ場合はハッシュを計算しない（変わった場合のみ内容を比べる）
+    - 出力ファイルが削除・上書きされた場合（サイズ・更新日時が記録と違う）は最新とみなさない
+    - 1ファイルごとに記録する（中断した場合も、次回は補正の終わっていないファイルから）
+
+2026 10 18 created
+"""
+
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from module_fds import file_digest
+
+logger = logging.getLogger(__name__)
+
+# 出力フォルダに作るマニフェストのファイル名（Calibrator.set_manifest）
+MANIFEST_NAME = ".calib_manifest.sqlite"
+# テーブルの形式（変えた場合は上げる、古いマニフェストは移行するか、バックアップを残して作り直す）
+MANIFEST_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    input TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    input_digest TEXT NOT NULL,
+    input_size INTEGER NOT NULL,
+    input_mtime_ns INTEGER NOT NULL,
+    inst_fingerprint TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    output TEXT NOT NULL,
+    output_size INTEGER NOT NULL,
+    output_mtime_ns INTEGER NOT NULL,
+    calibrated TEXT NOT NULL,
+    PRIMARY KEY (input, mode, output_dir)
+)
+"""
+_COLUMNS = [
+    "input", "mode", "output_dir", "input_digest", "input_size", "input_mtime_ns", "inst_fingerprint", "settings",
+    "direction", "output", "output_size", "output_mtime_ns", "calibrated"]
+
+
+class CalibrationManifest():
+    """
+    with CalibrationManifest(path_db) as manifest:
+        filepath_output, signature = manifest.check(filepath_input, "auto", dir_output, inst_fingerprint, settings)
+        if filepath_output is None:
+            ...  # calibrate
+            manifest.record(filepath_input, "auto", dir_output, signature, inst_fingerprint, settings, "on", filepath_output)
+
+    mode : 補正の指定 ("auto", "on", "off")、direction : 実際の補正後の状態 ("on", "off")
+    dir_output : 出力するフォルダ（同じマニフェストを別の出力フォルダで使う場合は別の記録になる）
+    settings : 出力に影響するその他の設定（文字列、補間の有無など）
+    """
+
+    def __init__(self, path_db) -> None:
+        self.path = Path(path_db)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 監視 (module_watch) と CLI が同時に使う場合は待つ
+        self._conn = sqlite3.connect(str(self.path), timeout=30.0)
+        _version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if _version != MANIFEST_VERSION:
+            self._upgrade(_version)
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def _upgrade(self, version: int) -> None:
+        """
+        version 1 : 出力フォルダの列がない（出力ファイルのフォルダを出力フォルダとして移行する）
+        それ以外 : 移行できないので、バックアップ (*.v{version}.bak) を残して作り直す
+        """
+        _exists = self._conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'outputs'").fetchone()[0]
+        if not _exists:
+            with self._conn:
+                self._conn.execute("PRAGMA user_version = {0:d}".format(MANIFEST_VERSION))
+            return
+        if version == 1:
+            with self._conn:
+                _rows = self._conn.execute("SELECT * FROM outputs").fetchall()
+                self._conn.execute("DROP TABLE outputs")
+                self._conn.execute(_SCHEMA)
+                # v1 : output_dir 以外は同じ列の順番
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [_row[:2] + (os.path.dirname(_row[8]),) + _row[2:] for _row in _rows])
+                self._conn.execute("PRAGMA user_version = {0:d}".format(MANIFEST_VERSION))
+            logger.info("manifest %s: migrated %d records from version 1", self.path, len(_rows))
+            return
+        _path_backup = self.path.with_name("{0}.v{1:d}.bak".format(self.path.name, version))
+        self._conn.close()
+        shutil.copy2(self.path, _path_backup)
+        logger.warning(
+            "manifest %s: unknown version %d, recreated (old records kept in %s)", self.path, version, _path_backup)
+        self._conn = sqlite3.connect(str(self.path), timeout=30.0)
+        with self._conn:
+            self._conn.execute("DROP TABLE IF EXISTS outputs")
+            self._conn.execute("PRAGMA user_version = {0:d}".format(MANIFEST_VERSION))
+
+    def check(self, filepath_input, mode: str, dir_output, inst_fingerprint: str, settings: str = ""):
+        """
+        Returns
+        -------
+        filepath_output (Path, None if not up to date),
+        signature of the input (digest, size, mtime_ns) for record (None if the input cannot be read)
+        """
+        _input = str(Path(filepath_input).resolve())
+        _dir_output = str(Path(dir_output).resolve())
+        try:
+            _stat = os.stat(filepath_input)
+            _row = self._conn.execute(
+                "SELECT input_digest, input_size, input_mtime_ns, inst_fingerprint, settings, "
+                "output, output_size, output_mtime_ns FROM outputs WHERE input = ? AND mode = ? AND output_dir = ?",
+                (_input, mode, _dir_output)).fetchone()
+            if _row is not None and (_row[1], _row[2]) == (_stat.st_size, _stat.st_mtime_ns):
+                _digest = _row[0]
+            else:
+                _digest = file_digest(filepath_input)
+        except OSError:
+            return None, None
+        signature = (_digest, _stat.st_size, _stat.st_mtime_ns)
+
+        if _row is None or _row[0] != _digest or _row[3] != inst_fingerprint or _row[4] != settings:
+            return None, signature
+        try:
+            _stat_output = os.stat(_row[5])
+        except OSError:
+            return None, signature
+        if (_stat_output.st_size, _stat_output.st_mtime_ns) != (_row[6], _row[7]):
+            return None, signature
+        if (_row[1], _row[2]) != (_stat.st_size, _stat.st_mtime_ns):
+            # 内容は同じで更新日時のみ変わった（次回はハッシュを計算しない）
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE outputs SET input_size = ?, input_mtime_ns = ? "
+                    "WHERE input = ? AND mode = ? AND output_dir = ?",
+                    (_stat.st_size, _stat.st_mtime_ns, _input, mode, _dir_output))
+        return Path(_row[5]), signature
+
+    def record(
+            self, filepath_input, mode: str, dir_output, signature, inst_fingerprint: str, settings: str,
+            direction: str, filepath_output) -> None:
+        """signature: returned by check (before calibration, so a file changed meanwhile is redone next time)"""
+        _stat_output = os.stat(filepath_output)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(Path(filepath_input).resolve()), mode, str(Path(dir_output).resolve()),
+                 signature[0], signature[1], signature[2], inst_fingerprint, settings, direction, str(Path(filepath_output).resolve()),
+                 _stat_output.st_size, _stat_output.st_mtime_ns, time.strftime("%Y-%m-%dT%H:%M:%S")))
+
+    def entries(self):
+        """Returns list of dict (one per output)"""
+        _rows = self._conn.execute("SELECT {0} FROM outputs ORDER BY input".format(", ".join(_COLUMNS))).fetchall()
+        return [dict(zip(_COLUMNS, _row)) for _row in _rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,197 @@
+"""
+CalibrationPipeline
+    読み込み → 補正 → 書き出し をスレッドで並行して行うバッチ処理クラス
+    （ネットワークドライブなど、読み書きの待ち時間が長い場合に使う）
+
+    reader (loadFDS) --queue--> compute (Calibrator) --queue--> writer (saveFDS)
+
+    - 段ごとにスレッド数を指定できる
+    - 段の間のキューは大きさに上限があり、前の段が先に進みすぎない（メモリ使用量を抑える）
+    - ファイルごとの結果 (CalibrationResult) は run を呼んだスレッドで callback に渡す
+
+2026 10 18 created
+"""
+
+import os
+import queue
+import threading
+import time
+from module_fds import loadFDS, saveFDS
+from module_calibration import Calibrator, CalibrationResult, CalibrationCancelled, CalibrationStats
+
+# キューの終わり
+_END = None
+
+
+class _Item():
+    """1ファイル分の処理中のデータ（段の間で受け渡す）"""
+
+    def __init__(self, index: int, filepath_input) -> None:
+        self.index = index
+        self.filepath_input = filepath_input
+        self.wl = None
+        self.data = None
+        self.header = None
+        self.filepath_output = None
+        self.error = None
+        self.stats = None
+
+
+class CalibrationPipeline():
+    """
+    pipeline = CalibrationPipeline(calibrator, n_readers=2, n_computers=1, n_writers=2)
+    results = pipeline.run(filepaths, callback=print)
+    """
+
+    def __init__(
+            self, calibrator: Calibrator, n_readers: int = 2, n_computers: int = 1, n_writers: int = 2,
+            queue_size: int = 4) -> None:
+        """
+        n_readers, n_computers, n_writers : スレッド数
+        queue_size : 段の間で待たせるファイル数の上限
+        """
+        if min(n_readers, n_computers, n_writers, queue_size) < 1:
+            raise ValueError("CalibrationPipeline: numbers of threads and queue_size must be 1 or more")
+        self.calibrator = calibrator
+        self.n_readers = n_readers
+        self.n_computers = n_computers
+        self.n_writers = n_writers
+        self.queue_size = queue_size
+
+    def run(self, filepaths_input, bool_off_to_on=None, callback=None, cancel_event=None):
+        """
+        Parameters
+        ----------
+        bool_off_to_on : bool or None
+            same as Calibrator.calibrate (None: auto detect for each file)
+        callback : callable
+            called with each CalibrationResult in this thread, in the order of completion
+        cancel_event : threading.Event
+            when set, files not read yet are skipped (error is CalibrationCancelled)
+
+        Returns
+        -------
+        list of CalibrationResult (same order as filepaths_input)
+        With Calibrator.set_manifest, inputs whose outputs are up to date are not calibrated (skipped=True).
+        """
+        if not self.calibrator.flag_inst_func:
+            raise ValueError("instrumental Function is not loaded")
+        if not self.calibrator.flag_output_dir:
+            raise ValueError("output path is not selected")
+        return self.calibrator.run_incremental(
+            lambda _paths, _callback: self._run(_paths, bool_off_to_on, _callback, cancel_event),
+            filepaths_input, bool_off_to_on, callback)
+
+    def _run(self, filepaths_input, bool_off_to_on, callback, cancel_event):
+        self._bool_off_to_on = bool_off_to_on
+        self._cancel = threading.Event() if cancel_event is None else cancel_event
+        self._stats_enabled = self.calibrator._stats_enabled
+
+        _inputs = queue.Queue()
+        for _i, _path in enumerate(filepaths_input):
+            _inputs.put(_Item(_i, _path))
+        _read = queue.Queue(maxsize=self.queue_size)
+        _computed = queue.Queue(maxsize=self.queue_size)
+        _done = queue.Queue()
+
+        _threads = (
+            self._start_stage("reader", self._read, _inputs, _read, self.n_readers, self.n_computers, close_input=True)
+            + self._start_stage("compute", self._compute, _read, _computed, self.n_computers, self.n_writers)
+            + self._start_stage("writer", self._write, _computed, _done, self.n_writers, 0))
+
+        results = [None] * len(filepaths_input)
+        try:
+            for _ in range(len(filepaths_input)):
+                item: _Item = _done.get()
+                results[item.index] = CalibrationResult(item.filepath_input, item.filepath_output, item.error, item.stats)
+                if item.stats is not None:
+                    self.calibrator._emit_stats(item.stats)
+                if callback is not None:
+                    callback(results[item.index])
+        except BaseException:
+            # 残りは読まずに終わらせる（スレッドが止まったままにならないように）
+            self._cancel.set()
+            while any(_thread.is_alive() for _thread in _threads):
+                try:
+                    _done.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            raise
+        for _thread in _threads:
+            _thread.join()
+        return results
+
+    def _start_stage(self, name: str, func, q_in, q_out, n_threads: int, n_next: int, close_input: bool = False):
+        """
+        func(item) を n_threads 個のスレッドで実行する
+        最後に終わったスレッドが、次の段のスレッド数だけ終わりの印を送る
+        """
+        _lock = threading.Lock()
+        _running = [n_threads]
+
+        def _worker():
+            try:
+                while True:
+                    if close_input:
+                        try:
+                            item = q_in.get_nowait()
+                        except queue.Empty:
+                            break
+                    else:
+                        item = q_in.get()
+                        if item is _END:
+                            break
+                    if item.error is None:
+                        try:
+                            func(item)
+                        except Exception as e:  # noqa
+                            item.error = e
+                            item.data = None
+                    q_out.put(item)
+            finally:
+                with _lock:
+                    _running[0] -= 1
+                    _last = _running[0] == 0
+                if _last:
+                    for _ in range(n_next):
+                        q_out.put(_END)
+
+        _threads = [
+            threading.Thread(target=_worker, name="pipeline-{0}-{1}".format(name, _n), daemon=True)
+            for _n in range(n_threads)]
+        for _thread in _threads:
+            _thread.start()
+        return _threads
+
+    def _read(self, item: _Item):
+        if self._cancel.is_set():
+            raise CalibrationCancelled(item.filepath_input)
+        if self._stats_enabled:
+            item.stats = CalibrationStats(item.filepath_input)
+        _t = time.perf_counter()
+        item.wl, item.data, item.header = loadFDS(item.filepath_input)
+        if item.stats is not None:
+            item.stats.add(
+                "load", time.perf_counter() - _t, os.path.getsize(item.filepath_input),
+                None if item.data is None else item.data.shape)
+
+    def _compute(self, item: _Item):
+        _t = time.perf_counter()
+        item.data = self.calibrator._calibrate_data(item.wl, item.data, item.header, self._bool_off_to_on)
+        if item.stats is not None:
+            item.stats.add("correct", time.perf_counter() - _t, item.data.nbytes, item.data.shape)
+
+    def _write(self, item: _Item):
+        _t = time.perf_counter()
+        _path_output = self.calibrator._output_path(item.filepath_input, item.header)
+        saveFDS(_path_output, item.wl, item.data, item.header)
+        item.filepath_output = _path_output
+        # 書き出した後はデータを持たない
+        item.wl = item.data = None
+        if item.stats is not None:
+            item.stats.add("save", time.perf_counter() - _t, os.path.getsize(_path_output))
+            item.stats.filepath_output = str(_path_output)
+
+
+if __name__ == "__main__":
+    pass
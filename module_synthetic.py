@@ -0,0 +1,201 @@
+"""
+ベンチマーク・動作確認用の FDS ファイル（日立 F7000 形式）を生成する
+
+make_synthetic_header
+    FdsHeader を作る（EN / JP、波長スキャン / 3-D scan、CorrSpectra On / Off）
+make_synthetic_spectrum, make_synthetic_eem
+    蛍光ピーク、散乱光、ノイズを含むデータを作る
+write_synthetic_fds
+    1ファイル書き出す
+write_synthetic_inst_files
+    装置関数ファイル（励起・蛍光 × 短波長・長波長）4つを書き出す
+make_synthetic_set
+    言語・測定種類・補正の有無の全組み合わせを書き出す
+
+2026 10 18 created
+"""
+
+from pathlib import Path
+import numpy as np
+from module_fds import FdsHeader, saveFDS
+
+# 3-D scan の大きさ: name -> (励起の間隔, 蛍光の間隔, 励起の範囲, 蛍光の範囲) [nm]
+SYNTHETIC_SIZES = {
+    "small": (10.0, 5.0, (200.0, 600.0), (250.0, 800.0)),      # 41 x 111
+    "medium": (5.0, 2.0, (200.0, 600.0), (250.0, 800.0)),      # 81 x 276
+    "large": (2.0, 1.0, (200.0, 700.0), (220.0, 900.0)),       # 251 x 681
+    "xlarge": (2.0, 0.5, (200.0, 900.0), (200.0, 900.0)),      # 351 x 1401
+}
+# 波長スキャンの間隔: name -> 間隔 [nm]（200 ～ 900 nm）
+SYNTHETIC_WL_STEPS = {"small": 1.0, "medium": 0.5, "large": 0.2, "xlarge": 0.1}
+
+_MEAS_TYPE = {("EN", "wl"): "Wavelength scan", ("JP", "wl"): "波長ｽｷｬﾝ", ("EN", "3d"): "3-D scan", ("JP", "3d"): "3次元"}
+_SCAN_MODE = {("EN", "em"): "Emission", ("JP", "em"): "蛍光ｽﾍﾟｸﾄﾙ", ("EN", "ex"): "Excitation", ("JP", "ex"): "励起ｽﾍﾟｸﾄﾙ"}
+
+
+def _wl_str(wl: float) -> str:
+    return "{0:.1f} nm".format(wl)
+
+
+def make_synthetic_header(
+        lang: str = "EN", meas: str = "3d", scan_mode: str = "em", corr: bool = False,
+        wl_ex: np.ndarray = None, wl_em: np.ndarray = None, rng: np.random.Generator = None) -> FdsHeader:
+    """
+    lang: "EN" or "JP", meas: "wl" (波長スキャン) or "3d", scan_mode: "em" or "ex" (波長スキャンのみ)
+    wl_ex, wl_em: 走査範囲（波長スキャンは走査側のみ使う）
+    corr: CorrSpectra（JP で On の場合は装置関数の欄も書き出される）
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    header = FdsHeader()
+    header.Language = lang
+    header.SampleName = "synthetic"
+    header.FileName = "synthetic"
+    header.MeasureDate = "10:00:00 2026/10/18"
+    header.Operator = "bench"
+    header.Comment = ""
+    header.Model = "F-7000"
+    header.SerialNum = "0000-000"
+    header.RomVer = "0000000-00"
+    header.MeasType = _MEAS_TYPE[(lang, meas)]
+    header.DataMode = "Fluorescence" if lang == "EN" else "蛍光"
+    header.ScanSpeed = "12000 nm/min" if meas == "3d" else "1200 nm/min"
+    header.Delay = "0 s"
+    header.ExSlit = "5.0 nm"
+    header.EmSlit = "5.0 nm"
+    header.PMTVolt = "700 V"
+    header.ResponseAT = "Auto"
+    header.CorrSpectra = corr
+    header.ContourStep = "10"
+
+    if meas == "wl":
+        header.ScanMode = _SCAN_MODE[(lang, scan_mode)]
+        _wl = wl_em if scan_mode == "em" else wl_ex
+        header.FixWL = "350.0 nm"
+        header.ScanExStartWL = _wl_str(_wl[0])
+        header.ScanExEndWL = _wl_str(_wl[-1])
+        header.ScanEmStartWL = _wl_str(_wl[0])
+        header.ScanEmEndWL = _wl_str(_wl[-1])
+    else:
+        header.ScanExStartWL = _wl_str(wl_ex[0])
+        header.ScanExEndWL = _wl_str(wl_ex[-1])
+        header.ScanExStepWL = _wl_str(wl_ex[1] - wl_ex[0])
+        header.ScanEmStartWL = _wl_str(wl_em[0])
+        header.ScanEmEndWL = _wl_str(wl_em[-1])
+        header.ScanEmStepWL = _wl_str(wl_em[1] - wl_em[0])
+
+    if corr:
+        _inst = header.Instrument
+        for _side in ["ex_s", "em_s", "ex_l", "em_l"]:
+            setattr(_inst, _side + "_slit_ex", float(rng.choice([2.5, 5.0, 10.0])))
+            setattr(_inst, _side + "_slit_em", float(rng.choice([2.5, 5.0, 10.0])))
+            setattr(_inst, _side + "_pmtvolt", float(rng.choice([400.0, 700.0, 950.0])))
+    return header
+
+
+def make_synthetic_spectrum(wl: np.ndarray, rng: np.random.Generator = None) -> np.ndarray:
+    """ガウス型のピーク数本 + ノイズ（一部は 9999.9 で飽和、一部は負）"""
+    rng = np.random.default_rng(0) if rng is None else rng
+    data = np.zeros(wl.size)
+    for _ in range(3):
+        data += rng.uniform(500, 12000) * np.exp(-0.5 * ((wl - rng.uniform(wl[0], wl[-1])) / rng.uniform(5, 40)) ** 2)
+    data += rng.normal(0, 2, wl.size)
+    return np.minimum(data, 9999.9)
+
+
+def make_synthetic_eem(wl_ex: np.ndarray, wl_em: np.ndarray, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    (em x ex) の EEM
+    蛍光成分（励起・蛍光スペクトルの積）、レイリー散乱（1次・2次）、ノイズ
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    _ex = wl_ex[None, :]
+    _em = wl_em[:, None]
+    data = np.zeros((wl_em.size, wl_ex.size))
+    for _ in range(3):
+        _peak_ex = rng.uniform(230, 450)
+        _peak_em = _peak_ex + rng.uniform(40, 150)
+        data += (rng.uniform(200, 5000)
+                 * np.exp(-0.5 * ((_ex - _peak_ex) / rng.uniform(10, 40)) ** 2)
+                 * np.exp(-0.5 * ((_em - _peak_em) / rng.uniform(15, 50)) ** 2))
+    data[_em < _ex] = 0
+    for _order, _height in [(1, 20000.0), (2, 3000.0)]:
+        data += _height * np.exp(-0.5 * ((_em - _order * _ex) / 3.0) ** 2)
+    data += rng.normal(0, 2, data.shape)
+    return np.minimum(data, 9999.9)
+
+
+def _wl_range(start: float, end: float, step: float) -> np.ndarray:
+    return np.round(start + step * np.arange(int(round((end - start) / step)) + 1), 3)
+
+
+def write_synthetic_fds(
+        path, lang: str = "EN", meas: str = "3d", scan_mode: str = "em", corr: bool = False,
+        size: str = "small", rng: np.random.Generator = None):
+    """
+    Returns
+    -------
+    path (Path)
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    if meas == "wl":
+        wl = _wl_range(200.0, 900.0, SYNTHETIC_WL_STEPS[size])
+        header = make_synthetic_header(lang, meas, scan_mode, corr, wl, wl, rng)
+        saveFDS(path, wl, make_synthetic_spectrum(wl, rng), header)
+    else:
+        _step_ex, _step_em, _range_ex, _range_em = SYNTHETIC_SIZES[size]
+        wl_ex = _wl_range(*_range_ex, _step_ex)
+        wl_em = _wl_range(*_range_em, _step_em)
+        header = make_synthetic_header(lang, meas, scan_mode, corr, wl_ex, wl_em, rng)
+        saveFDS(path, (wl_ex, wl_em), make_synthetic_eem(wl_ex, wl_em, rng), header)
+    return Path(path)
+
+
+def write_synthetic_inst_files(dir_output, rng: np.random.Generator = None):
+    """
+    装置関数ファイル（1 nm 間隔、短波長 200-600 nm、長波長 500-900 nm）
+
+    Returns
+    -------
+    filepath_exs, filepath_ems, filepath_exl, filepath_eml
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    Path(dir_output).mkdir(parents=True, exist_ok=True)
+    filepaths = []
+    for _name, _mode, _range in [("exs", "ex", (200.0, 600.0)), ("ems", "em", (200.0, 600.0)),
+                                 ("exl", "ex", (500.0, 900.0)), ("eml", "em", (500.0, 900.0))]:
+        wl = _wl_range(*_range, 1.0)
+        header = make_synthetic_header("JP", "wl", _mode, False, wl, wl, rng)
+        # 滑らかな感度曲線
+        data = 1.0 + 0.5 * np.sin((wl - wl[0]) / rng.uniform(50, 150)) + rng.normal(0, 0.005, wl.size)
+        _path = Path(dir_output) / "inst_{0}.TXT".format(_name)
+        saveFDS(_path, wl, data, header)
+        filepaths.append(_path)
+    return tuple(filepaths)
+
+
+def make_synthetic_set(dir_output, sizes=("small",), seed: int = 0):
+    """
+    EN / JP × 波長スキャン（励起・蛍光）/ 3-D scan × CorrSpectra Off / On の全組み合わせを sizes ごとに書き出す
+
+    Returns
+    -------
+    list of dict (path, lang, meas, scan_mode, corr, size)
+    """
+    rng = np.random.default_rng(seed)
+    Path(dir_output).mkdir(parents=True, exist_ok=True)
+    cases = []
+    for _size in sizes:
+        for _lang in ["EN", "JP"]:
+            for _meas, _scan_mode in [("wl", "ex"), ("wl", "em"), ("3d", "em")]:
+                for _corr in [False, True]:
+                    _name = "{0}_{1}_{2}_{3}.TXT".format(
+                        _size, _lang, "3d" if _meas == "3d" else _meas + _scan_mode, "on" if _corr else "off")
+                    _path = write_synthetic_fds(Path(dir_output) / _name, _lang, _meas, _scan_mode, _corr, _size, rng)
+                    cases.append({
+                        "path": str(_path), "lang": _lang, "meas": _meas, "scan_mode": _scan_mode,
+                        "corr": _corr, "size": _size})
+    return cases
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,159 @@
+"""
+FolderWatcher
+    入力フォルダ（サブフォルダを含む）を監視し、新しい・更新されたFDSファイルを
+    Calibrator で補正して出力フォルダに書き出すクラス
+
+    - ファイルの検出は os.scandir と stat のみ（内容の読み込み・ハッシュ計算はしない）
+    - サイズと更新日時が2回続けて同じで、settle_time 秒以上更新がないファイルを書き込み完了とみなす
+    - 処理済みのファイル（パス、サイズ、更新日時）は path_state のJSONに保存し、再起動後も再処理しない
+    - サブフォルダのファイルは出力フォルダの同じサブフォルダに書き出す（Calibrator.set_input_root）
+
+2026 10 18 created
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from module_calibration import Calibrator
+from module_fds import FDS_SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+WATCH_SUFFIXES = FDS_SUFFIXES
+# 出力ファイル（入力フォルダ内に出力する場合に再処理しない）
+OUTPUT_STEM_SUFFIXES = ("_calib_on", "_calib_off")
+
+
+class FolderWatcher():
+    """
+    watcher = FolderWatcher(calibrator, "path/to/input", "path/to/state.json")
+    watcher.run()   # stop() が呼ばれるまで（Ctrl+C でも終了）
+
+    calibrator は装置関数、出力フォルダが設定済みであること
+    """
+
+    def __init__(
+            self, calibrator: Calibrator, dir_input, path_state=None, bool_off_to_on=None,
+            jobs: int = None, interval: float = 5.0, settle_time: float = 10.0) -> None:
+        if not calibrator.is_ready():
+            raise ValueError("instrumental Function or output path is not set")
+        self.calibrator = calibrator
+        self.dir_input = Path(dir_input)
+        # a/s.TXT と b/s.TXT が同じ出力にならないように
+        calibrator.set_input_root(self.dir_input)
+        self.dir_output = Path(calibrator.output_dir).resolve()
+        self.path_state = Path(self.dir_output / ".watch_state.json" if path_state is None else path_state)
+        self.bool_off_to_on = bool_off_to_on
+        self.jobs = jobs
+        self.interval = interval
+        self.settle_time = settle_time
+
+        # path -> [size, mtime_ns, output or error]
+        self.state = self._load_state()
+        # 前回のポーリングで見つかった未処理のファイル path -> (size, mtime_ns)
+        self._pending = {}
+        self._stop = threading.Event()
+
+    def run(self, callback=None) -> None:
+        """
+        callback : called with each CalibrationResult
+        """
+        logger.info("watching %s -> %s", self.dir_input, self.dir_output)
+        self._stop.clear()
+        with self.calibrator.make_executor(self.jobs) as executor:
+            try:
+                while not self._stop.is_set():
+                    self.poll(executor, callback)
+                    self._stop.wait(self.interval)
+            except KeyboardInterrupt:
+                logger.info("stopped")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def poll(self, executor=None, callback=None):
+        """
+        One polling cycle: calibrate the files that are completely written
+
+        Returns
+        -------
+        list of CalibrationResult
+        """
+        _ready = self.find_ready()
+        if not _ready:
+            return []
+        results = self.calibrator.calibrate_many(
+            [_path for _path, _ in _ready], self.bool_off_to_on, jobs=self.jobs,
+            callback=callback, executor=executor)
+        for (_path, _signature), _result in zip(_ready, results):
+            # 失敗したファイルも記録し、更新されるまで再処理しない
+            _note = str(_result.filepath_output) if _result.ok else "error: {0}".format(_result.error)
+            self.state[_path] = [_signature[0], _signature[1], _note]
+            if _result.ok:
+                logger.info("calibrated %s -> %s", _path, _result.filepath_output)
+            else:
+                logger.error("failed %s: %s", _path, _result.error)
+        self._save_state()
+        return results
+
+    def find_ready(self):
+        """
+        Returns
+        -------
+        list of (path, (size, mtime_ns)) that are new or changed, and no longer being written
+        """
+        _now_ns = time.time_ns()
+        _ready = []
+        _pending = {}
+        for _path, _stat in self._scan(self.dir_input):
+            _signature = (_stat.st_size, _stat.st_mtime_ns)
+            _done = self.state.get(_path)
+            if _done is not None and (_done[0], _done[1]) == _signature:
+                continue
+            _settled = _now_ns - _stat.st_mtime_ns >= self.settle_time * 1e9
+            if self._pending.get(_path) == _signature and _settled:
+                _ready.append((_path, _signature))
+            else:
+                _pending[_path] = _signature
+        self._pending = _pending
+        return _ready
+
+    def _scan(self, dir_scan: Path):
+        try:
+            _entries = list(os.scandir(dir_scan))
+        except OSError as e:
+            logger.warning("cannot scan %s: %s", dir_scan, e)
+            return
+        for _entry in _entries:
+            try:
+                if _entry.is_dir(follow_symlinks=False):
+                    if Path(_entry.path).resolve() != self.dir_output:
+                        yield from self._scan(Path(_entry.path))
+                    continue
+                _name, _ext = os.path.splitext(_entry.name)
+                if _ext.lower() not in WATCH_SUFFIXES or _name.endswith(OUTPUT_STEM_SUFFIXES):
+                    continue
+                yield _entry.path, _entry.stat()
+            except OSError:
+                # 削除された・アクセスできないファイルは次回に回す
+                continue
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.path_state, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self) -> None:
+        _tmp = self.path_state.with_name(self.path_state.name + ".tmp")
+        with open(_tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=1)
+        os.replace(_tmp, self.path_state)
+
+
+if __name__ == "__main__":
+    pass
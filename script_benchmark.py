@@ -0,0 +1,135 @@
+"""
+読み込み・補正・書き出しのベンチマーク（module_synthetic で作ったファイルを使う）
+
+python script_benchmark.py --sizes small medium large -o benchmark.json
+
+各処理の時間（repeat 回の最小値・中央値）と tracemalloc のピークメモリを JSON に書き出す
+（時間の計測とメモリの計測は別に実行する。tracemalloc は処理を遅くするため）
+
+2026 10 18 created
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+from module_fds import loadFDS, loadFDS_DataList, saveFDS
+from module_calibration import Calibrator, calibrate_matrix, make_inst_func_matrix, _arrange_em_ex
+from module_synthetic import make_synthetic_set, write_synthetic_inst_files, SYNTHETIC_SIZES
+
+
+def measure(func, repeat: int = 5):
+    """
+    Returns
+    -------
+    dict (time_min, time_median [s], peak_memory [bytes])
+    """
+    _times = []
+    for _ in range(repeat):
+        _t = time.perf_counter()
+        func()
+        _times.append(time.perf_counter() - _t)
+    tracemalloc.start()
+    try:
+        func()
+        _, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"time_min": min(_times), "time_median": statistics.median(_times), "peak_memory": _peak}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_benchmarks(dir_work, sizes, repeat: int = 5, verbose: bool = True):
+    """
+    Returns
+    -------
+    list of dict (name, file, size, lang, meas, corr, time_min, time_median, peak_memory)
+    """
+    dir_work = Path(dir_work)
+    dir_output = dir_work / "output"
+    dir_output.mkdir(parents=True, exist_ok=True)
+    cases = make_synthetic_set(dir_work / "input", sizes)
+    filepaths_inst = write_synthetic_inst_files(dir_work / "inst")
+
+    results = []
+
+    def _record(name, func, case=None):
+        _result = {"name": name}
+        if case is not None:
+            _result.update({
+                "file": Path(case["path"]).name, "size": case["size"], "lang": case["lang"],
+                "meas": case["meas"], "corr": case["corr"]})
+        _result.update(measure(func, repeat))
+        results.append(_result)
+        if verbose:
+            print("{0:<22} {1:<28} {2:9.4f} s {3:9.1f} MiB".format(
+                name, _result.get("file", ""), _result["time_median"], _result["peak_memory"] / 2 ** 20))
+
+    _record("make_inst_func_matrix", lambda: make_inst_func_matrix(*filepaths_inst))
+
+    calibrator = Calibrator()
+    calibrator.set_mat_inst_func(*filepaths_inst)
+    calibrator.set_output_dir(dir_output)
+    _calib = (calibrator.vec_data_ex_inst, calibrator.vec_data_em_inst)
+
+    for case in cases:
+        _path = case["path"]
+        wl, data, header = loadFDS(_path)
+        wl_ex, wl_em, _data = _arrange_em_ex(wl, data, header)
+
+        _record("loadFDS", lambda: loadFDS(_path), case)
+        if case["meas"] == "wl":
+            _record("loadFDS_DataList", lambda: loadFDS_DataList(_path), case)
+        _record("saveFDS", lambda: saveFDS(dir_output / "save.TXT", wl, data, header), case)
+        _record("calibrate_matrix", lambda: calibrate_matrix(
+            _data, wl_ex, wl_em, _calib, calibrator.vec_wl_ex_inst, calibrator.vec_wl_em_inst), case)
+        _record("Calibrator.calibrate", lambda: calibrator.calibrate(_path), case)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark of parse, correct and write with synthetic FDS files")
+    parser.add_argument("--sizes", nargs="+", choices=list(SYNTHETIC_SIZES), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", default="benchmark.json", help="result file (JSON)")
+    parser.add_argument("--workdir", help="folder for the synthetic files (default: temporary folder)")
+    args = parser.parse_args(argv)
+
+    if args.workdir is None:
+        with tempfile.TemporaryDirectory() as _dir:
+            results = run_benchmarks(_dir, args.sizes, args.repeat)
+    else:
+        results = run_benchmarks(args.workdir, args.sizes, args.repeat)
+
+    _report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(_report, f, ensure_ascii=False, indent=1)
+    print("saved:", args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+補正の動作確認（module_synthetic で作ったファイルを使う）
+
+python script_check_calibration.py
+python -m pytest script_check_calibration.py
+
+2026 10 18 created
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+import numpy as np
+from module_fds import loadFDS, saveFDS
+from module_calibration import Calibrator
+from module_synthetic import write_synthetic_fds, write_synthetic_inst_files
+
+
+def test_one_axis_calibration(tmp_path):
+    """蛍光側の装置関数だけで補正した場合も、全てのセルが蛍光側の係数で補正される"""
+    _, filepath_ems, _, filepath_eml = write_synthetic_inst_files(tmp_path / "inst")
+    filepath_input = write_synthetic_fds(tmp_path / "eem.TXT", meas="3d", size="small")
+    calibrator = Calibrator()
+    calibrator.set_mat_inst_func(filepath_ems=filepath_ems, filepath_eml=filepath_eml)
+    (tmp_path / "output").mkdir()
+    calibrator.set_output_dir(tmp_path / "output")
+
+    wl, data, _ = loadFDS(filepath_input)
+    wl_out, calibrated, header = loadFDS(calibrator.calibrate(filepath_input, True))
+    assert header.CorrSpectra
+    _factor = np.interp(wl[1], calibrator.vec_wl_em_inst, calibrator.vec_data_em_inst)[:, None]
+    _expected = np.minimum(np.round(data * _factor, 1), 9999.9)
+    _changed = data != calibrated
+    assert _changed.sum() > 0.9 * (data > 0.5).sum()
+    # 出力の桁数（大きい値は整数）の分だけ違う
+    assert np.allclose(calibrated, _expected, rtol=1e-3, atol=0.11)
+
+
+def test_interpolated_round_trip(tmp_path):
+    """装置関数の間の波長（0.5 nm 間隔）でも OFF → ON → OFF で元に戻る（補間してから逆数にする）"""
+    filepaths_inst = write_synthetic_inst_files(tmp_path / "inst")
+    # 長波長側を2倍にして、つなぎ目 (500 nm) で装置関数に段差をつける（逆数の補間との差が大きい）
+    for _path in filepaths_inst[2:]:
+        wl_inst, data_inst, header_inst = loadFDS(_path)
+        saveFDS(_path, wl_inst, data_inst * 2, header_inst)
+    # つなぎ目でも差が分かるように一定の値にする
+    filepath_input = write_synthetic_fds(tmp_path / "wl.TXT", meas="wl", scan_mode="em", size="medium")
+    wl, data, header = loadFDS(filepath_input)
+    data = np.full(data.shape, 1000.0)
+    saveFDS(filepath_input, wl, data, header)
+    assert np.any(wl % 1 != 0)
+
+    calibrator = Calibrator()
+    calibrator.set_mat_inst_func(*filepaths_inst)
+    calibrator.set_interpolation(True)
+    (tmp_path / "output").mkdir()
+    calibrator.set_output_dir(tmp_path / "output")
+    filepath_on = calibrator.calibrate(filepath_input, True)
+    for _calibrate in [calibrator.calibrate, calibrator.calibrate_stream]:
+        wl_off, data_off, _ = loadFDS(_calibrate(filepath_on, False))
+        assert np.array_equal(wl, wl_off)
+        # 出力の桁数（1000 以上は整数）の分だけ違う
+        assert np.allclose(data_off, data, rtol=2e-3)
+
+
+def main() -> int:
+    _tests = [_func for _name, _func in sorted(globals().items()) if _name.startswith("test_")]
+    for _test in _tests:
+        with tempfile.TemporaryDirectory() as _dir:
+            _test(Path(_dir))
+        print("ok:", _test.__name__)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,7 +15,7 @@ window = MainWindow(app)
 window.core.check_output_filepath.setChecked(False)
 window.core.le_output_filepath.setText("path/to/dir")
 
-window.core.le_input_filepath.setText("path/to/inputfile.TXT")
+window.core.add_to_queue(["path/to/inputfile.TXT"])
 
 window.core.le_ex_short_path.setText("path/to/inputfile_exs.TXT")
 window.core.le_em_short_path.setText("path/to/inputfile_ems.TXT")
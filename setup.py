@@ -19,10 +19,21 @@ if sys.platform == "win32":
 # パッケージやファイルに関する設定 packagesに関してはなにも記載する必要なし
 packages = []
 # 必要なパッケージを指定。動作に必須
-includes = ["PySide6", "numpy"]
+# PySide6 は使うモジュールだけ（全体を含めると起動が遅くなる）
+includes = ["PySide6.QtCore", "PySide6.QtGui", "PySide6.QtWidgets", "numpy"]
 # includes = []
 # 不要なパッケージを指定。きちんと設定できると高速起動高速動作
 excludes = ["PyQt5", "PySide2", "pandas", "tkinter", "matplotlib", "scipy", "numba"]
+# 使わない Qt のモジュール（module_gui_calibration.spec の excludes と同じ）
+excludes_qt = [
+    "PySide6.QtNetwork", "PySide6.QtQml", "PySide6.QtQuick", "PySide6.QtQuickWidgets",
+    "PySide6.QtWebEngineCore", "PySide6.QtWebEngineWidgets", "PySide6.QtWebChannel", "PySide6.QtWebSockets",
+    "PySide6.QtMultimedia", "PySide6.QtMultimediaWidgets", "PySide6.QtSql", "PySide6.QtSvg",
+    "PySide6.QtPdf", "PySide6.QtCharts", "PySide6.QtDataVisualization", "PySide6.QtOpenGL",
+    "PySide6.QtOpenGLWidgets", "PySide6.Qt3DCore", "PySide6.Qt3DRender", "PySide6.QtBluetooth",
+    "PySide6.QtPositioning", "PySide6.QtSensors", "PySide6.QtSerialPort", "PySide6.QtTest",
+    "PySide6.QtDesigner", "PySide6.QtHelp", "PySide6.QtUiTools", "PySide6.QtXml"]
+excludes += excludes_qt
 # excludes = []
 # 一緒にコピーするファイルを指定
 incfiles = []
@@ -35,6 +46,12 @@ my_exe = Executable(
     base=base,
     targetName="SpectralCorrectionTool_" + str_ver + ".exe"
 )
+# コマンドライン版（Qtを使わない、コンソールを表示する）
+my_exe_cli = Executable(
+    script='module_cli.py',
+    base=None,
+    targetName="SpectralCorrectionTool_cli_" + str_ver + ".exe"
+)
 
 # 設定の有効化。バージョンや名前はここで設定
 # （適用されていない気もする）
@@ -45,5 +62,5 @@ setup(
         'include_files': incfiles, 'includes': includes,
         'excludes': excludes, 'packages': packages}
     },
-    executables=[my_exe]
+    executables=[my_exe, my_exe_cli]
 )